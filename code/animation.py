@@ -0,0 +1,71 @@
+from settings import *
+from contextlib import contextmanager
+from weakref import WeakKeyDictionary, WeakValueDictionary
+
+class AnimationClock:
+    '''A frame counter shared by everything that plays the same frames at the same speed'''
+    def __init__(self, frames, speed) -> None:
+        self.frames = frames
+        self.speed = speed
+        self.frame_index = 0
+        self.index = 0
+        self.image = self.frames[0]
+
+    def update(self, dt) -> None:
+        '''Advance through the frames'''
+        self.frame_index += self.speed * dt
+        self.index = int(self.frame_index % len(self.frames))
+        self.image = self.frames[self.index]
+
+class AnimationClocks:
+    '''Registry of animation clocks keyed by frame list and speed. Clocks are dropped once no sprite or tile holds them.
+    Every stage has clocks of its own, only the running stage's clocks and the shared ones, like the HUD's, are advanced.
+    A level built in the background or left paused keeps its animations where they are.'''
+    def __init__(self) -> None:
+        self.shared: WeakValueDictionary[tuple[int, float], AnimationClock] = WeakValueDictionary()
+        self.scopes: WeakKeyDictionary[object, WeakValueDictionary] = WeakKeyDictionary()
+        self.scope = None
+
+    @contextmanager
+    def using(self, scope):
+        '''Give the clocks made inside the block to a stage'''
+        previous, self.scope = self.scope, scope
+        try:
+            yield
+        finally:
+            self.scope = previous
+
+    def get(self, frames, speed= ANIMATION_SPEED) -> AnimationClock:
+        '''Return the clock for the frame list and speed, creating it on first use'''
+        clocks = self.shared if self.scope is None else self.scopes.setdefault(self.scope, WeakValueDictionary())
+        # the clock keeps its frame list alive, so the id can't be reused while the key exists
+        key = (id(frames), speed)
+        clock = clocks.get(key)
+        if clock is None:
+            clock = AnimationClock(frames, speed)
+            clocks[key] = clock
+        return clock
+
+    def update(self, dt, stage) -> None:
+        '''Advance the clocks of the running stage and the shared ones once, called once per frame by the stage.
+        Clocks made after it, while the stage runs, belong to the stage.'''
+        self.scope = stage
+        for clock in self.shared.values():
+            clock.update(dt)
+        for clock in self.scopes.get(stage, {}).values():
+            clock.update(dt)
+
+animation_clocks = AnimationClocks()
+
+def tile_animation(tmx_map, gid: int, cache: dict) -> AnimationClock | None:
+    '''Return the clock of an animated Tiled tile or None for a static one. Frame lists are shared through the cache'''
+    properties = tmx_map.get_tile_properties_by_gid(gid) if gid else None
+    if not properties or not properties.get('frames'):
+        return None
+    if gid not in cache:
+        # Tiled stores a duration per frame in ms, the clock plays them at their average rate
+        frames = properties['frames']
+        duration = sum(frame.duration for frame in frames) / len(frames)
+        cache[gid] = ([tmx_map.get_tile_image_by_gid(frame.gid) for frame in frames], 1000 / duration)
+    frames, speed = cache[gid]
+    return animation_clocks.get(frames, speed)
@@ -0,0 +1,152 @@
+from settings import *
+import support
+from support import Atlas, Frames, masks
+from collections import OrderedDict
+from hashlib import sha1
+from os import makedirs, replace, stat, walk
+from os.path import isdir, relpath
+
+class AssetBundle:
+    '''Atlas pages, frame rects and masks saved in the display pixel format.
+    Loading maps the pages into memory and wraps them in surfaces, no PNG is decoded.'''
+    version = 1
+
+    def __init__(self, path: str, *sources: str) -> None:
+        makedirs(path, exist_ok= True)
+        self.index_path = join(path, 'assets.index')
+        self.pages_path = join(path, 'assets.pages')
+        # the bundle goes stale when an image changes, or the code that decides what is loaded and how
+        self.sources = sources + (support.__file__, __file__)
+        self.pixel_format = self.get_pixel_format()
+        self.signature = self.get_signature()
+        self.atlas: Atlas | None = None
+        self.buffer: np.memmap | None = None
+        self.page_masks: list[pygame.Mask] = []
+
+    @staticmethod
+    def get_pixel_format() -> str:
+        '''Byte order of the surfaces made by convert_alpha, pages stored in it are used on load without converting'''
+        masks = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha().get_masks()
+        if sys.byteorder == 'little' and masks == (0xff0000, 0xff00, 0xff, 0xff000000):
+            return 'BGRA'
+        return 'RGBA'
+
+    def get_signature(self) -> str:
+        '''Hash of the size and modification time of every source file'''
+        files = []
+        for source in self.sources:
+            if isdir(source):
+                for folder_path, _, file_names in walk(source):
+                    files += [join(folder_path, file_name) for file_name in file_names]
+            else:
+                files.append(source)
+        entries = [self.version, self.pixel_format]
+        for file in sorted(files):
+            info = stat(file)
+            entries.append((relpath(file), info.st_size, info.st_mtime_ns))
+        return sha1(repr(entries).encode()).hexdigest()
+
+    def load(self) -> dict | None:
+        '''Map the bundle and return its top level entries, each one is turned into surfaces by decode.
+        Returns None when there is no bundle or it is out of date'''
+        try:
+            with open(self.index_path, 'rb') as file:
+                index = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if index.get('signature') != self.signature:
+            return None
+
+        # copy on write, the file is never changed by drawing onto a page
+        buffer = self.buffer = np.memmap(self.pages_path, dtype= np.uint8, mode= 'c')
+        self.atlas = Atlas()
+        self.page_masks = []
+        for offset, size, mask_bits in index['pages']:
+            width, height = size
+            page = pygame.image.frombuffer(buffer[offset:offset + width * height * 4], size, self.pixel_format)
+            if self.pixel_format != 'BGRA':
+                page = page.convert_alpha()
+            self.atlas.pages.append(page)
+            mask = pygame.mask.Mask(size)
+            memoryview(mask).cast('B')[:] = mask_bits
+            self.page_masks.append(mask)
+        _, entries = index['assets']
+        return entries
+
+    def decode(self, entry: tuple):
+        '''Build the surfaces, frames and masks of a bundle entry'''
+        kind, value = entry
+        if kind == 'dict':
+            return {key: self.decode(item) for key, item in value.items()}
+        if kind == 'surface':
+            return self.subsurface(value)
+        variants = {}
+        for key, rects in value.items():
+            variant = variants[key] = [self.subsurface(rect) for rect in rects]
+            for surface, (page, x, y, width, height) in zip(variant, rects):
+                # cut the frame's mask out of the page mask
+                mask = masks[surface] = pygame.mask.Mask((width, height))
+                mask.draw(self.page_masks[page], (-x, -y))
+        return Frames(variants.pop((False, 0)), variants= variants)
+
+    def subsurface(self, rect: tuple[int, int, int, int, int]) -> pygame.Surface:
+        page, x, y, width, height = rect
+        return self.atlas.pages[page].subsurface((x, y, width, height))
+
+    def save(self, atlas: Atlas, assets: dict) -> None:
+        '''Write the atlas pages and the layout of the assets in them'''
+        self.atlas = atlas
+        pages, offset = [], 0
+        with open(self.pages_path, 'wb') as file:
+            for page in atlas.pages:
+                file.write(pygame.image.tobytes(page, self.pixel_format))
+                pages.append((offset, page.size, bytes(memoryview(pygame.mask.from_surface(page)).cast('B'))))
+                offset += page.width * page.height * 4
+
+        # the index is written last and swapped in whole, so a half written bundle is never loaded
+        index = {'signature': self.signature, 'pages': pages, 'assets': self.encode(assets)}
+        with open(self.index_path + '.tmp', 'wb') as file:
+            pickle.dump(index, file)
+        replace(self.index_path + '.tmp', self.index_path)
+
+    def encode(self, asset):
+        if isinstance(asset, Frames):
+            return ('frames', {key: [self.rect(surface) for surface in variant] for key, variant in asset.variants.items()})
+        if isinstance(asset, dict):
+            return ('dict', {key: self.encode(item) for key, item in asset.items()})
+        return ('surface', self.rect(asset))
+
+    def rect(self, surface: pygame.Surface) -> tuple[int, int, int, int, int]:
+        '''Page index and area of a surface packed into the atlas'''
+        page = surface.get_parent()
+        index = next(index for index, atlas_page in enumerate(self.atlas.pages) if atlas_page is page)
+        return (index, *surface.get_offset(), *surface.size)
+
+class FrameSets:
+    '''The level frame sets of a bundle, each one is decoded the first time a level needs it.
+    Sets the current level doesn't use are dropped least recently used first once there are more than capacity.'''
+    def __init__(self, bundle: AssetBundle, entry: tuple, capacity: int = 10) -> None:
+        self.bundle = bundle
+        _, self.entries = entry
+        self.capacity = capacity
+        self.loaded: OrderedDict[str, dict | Frames] = OrderedDict()
+
+    def __getitem__(self, name: str) -> dict | Frames:
+        if name not in self.loaded:
+            self.loaded[name] = self.bundle.decode(self.entries[name])
+        self.loaded.move_to_end(name)
+        return self.loaded[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def require(self, names: set[str]) -> None:
+        '''Load the sets a stage is about to use and evict unused ones over capacity, names that aren't frame sets are skipped'''
+        names = names & self.entries.keys()
+        for name in names:
+            self[name]
+        for name in list(self.loaded):
+            if len(self.loaded) <= self.capacity:
+                break
+            if name not in names:
+                del self.loaded[name]
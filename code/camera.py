@@ -4,6 +4,10 @@ if TYPE_CHECKING:
     from gdata import GameData
 
 from settings import *
+from bisect import insort
+from math import floor
+from animation import AnimationClock
+from spatial import SpatialHash
 
 
 class CameraGroup(pygame.sprite.Group):
@@ -13,13 +17,22 @@ class CameraGroup(pygame.sprite.Group):
         self.data: GameData = data
         #self.ui_sprites = [sprite for sprite in data.ui.sprites]
         
-        self.display: pygame.Surface = pygame.display.get_surface()
         self.screen: pygame.Surface = data.screen
         self.screen_rect: pygame.FRect = self.screen.get_frect()
         self.offset: vector = vector()
         self.width: int = width * TILE_SIZE
         self.height: int = height * TILE_SIZE
         
+        # render layers, one spatial hash per Z layer for view culling
+        self.render_layers: dict[int, SpatialHash] = {z: SpatialHash() for z in sorted(Z_LAYERS.values())}
+        self.sprite_layers: dict[pygame.sprite.Sprite, SpatialHash] = {}
+        self.pending_sprites: dict[pygame.sprite.Sprite, None] = {}
+        self.moving_sprites: dict[pygame.sprite.Sprite, SpatialHash] = {}
+        self.view_margin: int = TILE_SIZE * 2
+        
+        # static tile layers baked into chunks, one set per Z layer
+        self.tile_chunks: dict[int, TileChunks] = {}
+        
         # minimap
         self.minimap = MiniMap(width, height)
         
@@ -38,6 +51,53 @@ class CameraGroup(pygame.sprite.Group):
                                        (self.screen_rect.width - (self.camera_bounds['left'] + self.camera_bounds['right']),
                                         self.screen_rect.height - (self.camera_bounds['top'] + self.camera_bounds['bottom'])))
     
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer= None) -> None:
+        '''Sprites join groups before their rect exists, so they are indexed on the next draw'''
+        super().add_internal(sprite, layer)
+        self.pending_sprites[sprite] = None
+    
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        super().remove_internal(sprite)
+        self.pending_sprites.pop(sprite, None)
+        self.moving_sprites.pop(sprite, None)
+        if sprite in self.sprite_layers:
+            self.sprite_layers.pop(sprite).remove(sprite)
+    
+    def index_sprites(self) -> None:
+        '''Put newly added sprites in the render layer of their Z value and re-bucket the ones that can move'''
+        for sprite in self.pending_sprites:
+            layer = self.render_layers[sprite.z]
+            layer.add(sprite)
+            self.sprite_layers[sprite] = layer
+            # sprites without their own update method never move
+            if type(sprite).update is not pygame.sprite.Sprite.update:
+                self.moving_sprites[sprite] = layer
+        self.pending_sprites.clear()
+        
+        for sprite, layer in self.moving_sprites.items():
+            layer.move(sprite)
+    
+    def bake_tile(self, position: tuple[int, int], surface: pygame.Surface, z: int) -> None:
+        '''Bake a tile that never changes into the chunks of its Z layer instead of drawing it as a sprite'''
+        if z not in self.tile_chunks:
+            self.tile_chunks[z] = TileChunks()
+        self.tile_chunks[z].bake(position, surface)
+    
+    def show_tiles(self, visibility: dict[tuple[int, int], bool], z: int) -> None:
+        '''Hide or show the baked and animated tiles of a Z layer at some positions'''
+        if z in self.tile_chunks:
+            self.tile_chunks[z].show(visibility)
+    
+    def add_animated_tile(self, position: tuple[int, int], clock: AnimationClock, z: int) -> None:
+        '''Add a tile that shows the current frame of a shared animation clock'''
+        if z not in self.tile_chunks:
+            self.tile_chunks[z] = TileChunks()
+        self.tile_chunks[z].add_animated(position, clock)
+    
+    def view_rect(self) -> pygame.FRect:
+        '''The area of the level stage seen by the camera, grown by a margin'''
+        return pygame.FRect(-self.offset.x, -self.offset.y, SCREEN_WIDTH, SCREEN_HEIGHT).inflate(self.view_margin * 2, self.view_margin * 2)
+    
     def camera_constraint(self) -> None:
         '''Don't allow camera movement when reaching level stage sides'''
         self.offset.x = self.offset.x if self.offset.x < self.borders['left'] else 0
@@ -60,67 +120,151 @@ class CameraGroup(pygame.sprite.Group):
         self.offset.x = -self.camera_box.left + self.camera_bounds['left']
         self.offset.y = -self.camera_box.top + self.camera_bounds['top']
     
-    def toggle_minimap(self) -> None:
+    def toggle_minimap(self, target: pygame.FRect) -> None:
         '''Show minimap while holding M key'''
         keys = pygame.key.get_pressed()
         if keys[pygame.K_m]:
-            self.display.blit(self.minimap.scaled_surface, (10, WINDOW_HEIGHT - self.minimap.scaled_surface.height - 10))
+            self.minimap.draw(self.screen, (4, SCREEN_HEIGHT - self.minimap.size[1] - 4), target)
     
     def draw(self, target: pygame.FRect, dt: float):
-        '''The custom draw method for the CameraGroup that draws in Z layer order'''
+        '''The custom draw method for the CameraGroup that draws the sprites in view in Z layer order'''
         
         self.box_target_camera(target)
         #self.target_center_camera(target)
         self.camera_constraint()
         
-        self.minimap.update(self.sprites())
-        
         self.screen.fill('black')
         
-        for sprite in sorted(self, key= lambda sprite: sprite.z):
-            offset_pos = round(sprite.rect.left + self.offset.x), round(sprite.rect.top + self.offset.y)
-            #offset_pos = sprite.rect.topleft + self.offset
-            self.screen.blit(sprite.image, offset_pos)
+        self.index_sprites()
+        
+        screen_rect = pygame.FRect(-self.offset.x, -self.offset.y, SCREEN_WIDTH, SCREEN_HEIGHT)
+        view_rect = self.view_rect()
+        for z, layer in self.render_layers.items():
+            # baked tiles go under the sprites of their Z layer
+            if z in self.tile_chunks:
+                self.tile_chunks[z].draw(self.screen, screen_rect, self.offset)
+            for sprite in layer.query(view_rect):
+                offset_pos = round(sprite.rect.left + self.offset.x), round(sprite.rect.top + self.offset.y)
+                #offset_pos = sprite.rect.topleft + self.offset
+                self.screen.blit(sprite.image, offset_pos)
         
         #for sprite in self.ui_sprites:
         #    self.screen.blit(sprite.image, sprite.rect)
         
-        #pygame.transform.scale(self.screen, (WINDOW_WIDTH, WINDOW_HEIGHT), self.display)
-        #self.display.blit(pygame.transform.scale(self.screen, (1280, 720)), (43, 24))
-        
-        self.toggle_minimap()
+        self.toggle_minimap(target)
+
+
+class TileChunks:
+    '''Static tiles of one Z layer pre-rendered into fixed-size chunk surfaces, animated tiles are kept per chunk.
+    The tiles baked into a chunk are remembered, so tiles can be hidden and shown again when the terrain changes.'''
+    def __init__(self, chunk_size: int = 256) -> None:
+        self.chunk_size = chunk_size
+        self.chunks: dict[tuple[int, int], pygame.Surface] = {}
+        self.tiles: dict[tuple[int, int], list[tuple[tuple[int, int], pygame.Surface]]] = {}
+        self.tile_chunks: dict[tuple[int, int], set[tuple[int, int]]] = {}     # the chunks the tiles at a position were baked into
+        self.animated: dict[tuple[int, int], list[tuple[tuple[int, int], AnimationClock]]] = {}
+        self.hidden: set[tuple[int, int]] = set()
+    
+    def bake(self, position: tuple[int, int], surface: pygame.Surface) -> None:
+        '''Blit a tile into every chunk it overlaps'''
+        size = self.chunk_size
+        x, y = position
+        for cx in range(int(x // size), int((x + surface.width - 1) // size) + 1):
+            for cy in range(int(y // size), int((y + surface.height - 1) // size) + 1):
+                if (cx, cy) not in self.chunks:
+                    self.chunks[(cx, cy)] = pygame.Surface((size, size), pygame.SRCALPHA)
+                self.tiles.setdefault((cx, cy), []).append((position, surface))
+                self.tile_chunks.setdefault(position, set()).add((cx, cy))
+                if position not in self.hidden:
+                    self.chunks[(cx, cy)].blit(surface, (x - cx * size, y - cy * size))
+    
+    def show(self, visibility: dict[tuple[int, int], bool]) -> None:
+        '''Hide or show the tiles at some positions, every chunk holding one that changed is baked again once'''
+        changed = set()
+        for position, visible in visibility.items():
+            if visible == (position in self.hidden):
+                changed.update(self.tile_chunks.get(position, ()))
+                if visible:
+                    self.hidden.discard(position)
+                else:
+                    self.hidden.add(position)
+        size = self.chunk_size
+        for cx, cy in changed:
+            chunk = self.chunks[(cx, cy)]
+            chunk.fill((0, 0, 0, 0))
+            for position, surface in self.tiles[(cx, cy)]:
+                if position not in self.hidden:
+                    chunk.blit(surface, (position[0] - cx * size, position[1] - cy * size))
+    
+    def add_animated(self, position: tuple[int, int], clock: AnimationClock) -> None:
+        '''Keep an animated tile with the chunk its grid aligned top left corner is in'''
+        size = self.chunk_size
+        self.animated.setdefault((int(position[0] // size), int(position[1] // size)), []).append((position, clock))
+    
+    def draw(self, surface: pygame.Surface, area: pygame.FRect, offset: vector) -> None:
+        '''Blit the chunks overlapping an area of the level stage and the animated tiles in them'''
+        size = self.chunk_size
+        for cx in range(int(area.left // size), int((area.right - 1) // size) + 1):
+            for cy in range(int(area.top // size), int((area.bottom - 1) // size) + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk:
+                    surface.blit(chunk, (round(cx * size + offset.x), round(cy * size + offset.y)))
+                for (x, y), clock in self.animated.get((cx, cy), ()):
+                    if (x, y) not in self.hidden:
+                        surface.blit(clock.image, (round(x + offset.x), round(y + offset.y)))
 
 
 class MiniMap:
-    def __init__(self, width: int, height: int) -> None:
-        '''A MiniMap surface that displays terrain and player position'''
-        self.surface = pygame.Surface((width, height))
-        self.scaled_surface = pygame.Surface((320, 240))
-    
-    def update(self, sprites: list) -> None:
-        '''Update sprite positions'''
-        self.scaled_surface.fill('black')
-        self.surface.fill('black')
-        
-        for sprite in sprites:
-            if hasattr(sprite, 'map_image'):
-                self.surface.blit(sprite.map_image, (sprite.map_rect))
-        
-        scaled = pygame.transform.scale(self.surface, self.scaled_surface.size)
-        self.scaled_surface.blit(scaled, (0, 0))
+    '''A MiniMap surface that displays terrain and player position'''
+    def __init__(self, width: int, height: int, size: tuple[int, int] = (64, 48)) -> None:
+        self.size = size
+        self.scale = vector(size[0] / width, size[1] / height)
+        
+        # one pixel per tile, indexed [x, y] like pygame.surfarray
+        self.tiles = np.zeros((width, height, 3), dtype= np.uint8)
+        self.terrain: pygame.Surface | None = None
+    
+    def mark_tile(self, x: int, y: int, colour: str) -> None:
+        '''Mark a tile on the map, the terrain is baked again the next time the minimap is shown'''
+        self.tiles[x, y] = pygame.Color(colour)[:3]
+        self.terrain = None
+    
+    def draw(self, surface: pygame.Surface, position: tuple[int, int], target: pygame.FRect) -> None:
+        '''Draw the baked terrain and a marker at the target position'''
+        if self.terrain is None:
+            self.terrain = pygame.transform.scale(pygame.surfarray.make_surface(self.tiles), self.size)
+        surface.blit(self.terrain, position)
+        
+        marker = pygame.FRect(position[0] + int(target.x / TILE_SIZE) * self.scale.x,
+                              position[1] + int(target.y / TILE_SIZE) * self.scale.y,
+                              self.scale.x, self.scale.y)
+        pygame.draw.rect(surface, 'red', marker)
 
 
 class OverworldCamera(pygame.sprite.Group):
     def __init__(self, width: int, height: int, data: GameData) -> None:
         super().__init__()
-        self.display = pygame.display.get_surface()
-        #self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.screen = data.screen
         self.data = data
         self.offset = vector()
         
         self.width, self.height = width * TILE_SIZE, height * TILE_SIZE
         
+        # render layers in Z order, the main layer is kept sorted by y position
+        self.render_layers: dict[int, dict[pygame.sprite.Sprite, None]] = {z: {} for z in sorted(Z_LAYERS.values())}
+        self.main_sprites: list[pygame.sprite.Sprite] = []
+        self.sort_keys: dict[pygame.sprite.Sprite, float] = {}
+        self.pending_sprites: dict[pygame.sprite.Sprite, None] = {}
+        self.animated_tiles: dict[int, list[tuple[vector, AnimationClock]]] = {}
+        self.animated_clocks: list[AnimationClock] = []
+        
+        # everything below the main layer is drawn onto map sized surfaces,
+        # the animated tiles once per combination of their clocks' frames
+        # and the static sprites once per unlocked level
+        self.animated_layers: dict[tuple[int, ...], pygame.Surface] = {}
+        self.static_layer = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        self.static_level = None
+        
         # camera boundaries
         self.borders = {
             'left': 0,
@@ -129,6 +273,72 @@ class OverworldCamera(pygame.sprite.Group):
             'top': 0
         }
     
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer= None) -> None:
+        '''Sprites join groups before their Z value is set, so they get a render layer on the next draw'''
+        super().add_internal(sprite, layer)
+        self.pending_sprites[sprite] = None
+    
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        super().remove_internal(sprite)
+        self.pending_sprites.pop(sprite, None)
+        if sprite in self.sort_keys:
+            del self.sort_keys[sprite]
+            self.main_sprites.remove(sprite)
+        elif hasattr(sprite, 'z') and sprite in self.render_layers[sprite.z]:
+            del self.render_layers[sprite.z][sprite]
+            self.static_level = None
+    
+    def index_sprites(self) -> None:
+        '''Put new sprites in their render layer and re-sort the main layer sprites that moved'''
+        for sprite in self.pending_sprites:
+            if sprite.z == Z_LAYERS['main']:
+                self.sort_keys[sprite] = sprite.rect.centery
+                insort(self.main_sprites, sprite, key= lambda sprite: self.sort_keys[sprite])
+            else:
+                self.render_layers[sprite.z][sprite] = None
+                self.static_level = None
+        self.pending_sprites.clear()
+        
+        for sprite, key in self.sort_keys.items():
+            if sprite.rect.centery != key:
+                self.main_sprites.remove(sprite)
+                self.sort_keys[sprite] = sprite.rect.centery
+                insort(self.main_sprites, sprite, key= lambda sprite: self.sort_keys[sprite])
+    
+    def add_animated_tile(self, position: tuple[int, int], clock: AnimationClock, z: int) -> None:
+        '''Add a tile that shows the current frame of a shared animation clock'''
+        self.animated_tiles.setdefault(z, []).append((vector(position), clock))
+        if clock not in self.animated_clocks:
+            self.animated_clocks.append(clock)
+        self.animated_layers.clear()
+    
+    def get_animated_layer(self) -> pygame.Surface:
+        '''The animated tiles showing the current frames of their clocks, drawn the first time those frames come up together'''
+        key = tuple(clock.index for clock in self.animated_clocks)
+        layer = self.animated_layers.get(key)
+        if layer is None:
+            # clocks with different frame counts could make the combinations pile up
+            if len(self.animated_layers) >= 16:
+                self.animated_layers.clear()
+            layer = self.animated_layers[key] = pygame.Surface((self.width, self.height)).convert()
+            layer.fill('black')
+            for z in sorted(self.animated_tiles):
+                layer.blits([(clock.image, position) for position, clock in self.animated_tiles[z]], doreturn= False)
+        return layer
+    
+    def bake_static_layer(self) -> None:
+        '''Draw the tiles, objects and the paths and nodes of the unlocked levels below the main layer'''
+        self.static_level = self.data.unlocked_level
+        self.static_layer.fill((0, 0, 0, 0))
+        for z, layer in self.render_layers.items():
+            if z >= Z_LAYERS['main']:
+                break
+            if z == Z_LAYERS['path']:
+                sprites = [sprite for sprite in layer if sprite.level <= self.static_level]
+            else:
+                sprites = layer
+            self.static_layer.blits([(sprite.image, sprite.rect.topleft) for sprite in sprites], doreturn= False)
+    
     def camera_constraint(self) -> None:
         '''Don't allow camera movement when reaching level stage sides'''
         self.offset.x = self.offset.x if self.offset.x < self.borders['left'] else 0
@@ -145,22 +355,21 @@ class OverworldCamera(pygame.sprite.Group):
         
         self.camera_constraint()
         
-        # background
-        for sprite in sorted(self, key= lambda sprite: sprite.z):
-            if sprite.z < Z_LAYERS['main']:
-                if sprite.z == Z_LAYERS['path']:
-                    if sprite.level <= self.data.unlocked_level:
-                        self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
-                else:
-                    self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
+        self.index_sprites()
         
-        # main
-        for sprite in sorted(self, key= lambda sprite: sprite.rect.centery):
-            if sprite.z == Z_LAYERS['main']:
-                if hasattr(sprite, 'icon'):
-                    self.screen.blit(sprite.image, sprite.rect.topleft + self.offset + vector(0, -8))
-                else:
-                    self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
+        # background, the animated tiles sit below the static ones
+        if self.static_level != self.data.unlocked_level:
+            self.bake_static_layer()
+        # floored so every tile lands on the same pixel grid, a float blit position is truncated towards zero
+        position = (floor(self.offset.x), floor(self.offset.y))
+        if self.animated_tiles:
+            self.screen.blit(self.get_animated_layer(), position)
+        self.screen.blit(self.static_layer, position)
         
-        pygame.transform.scale(self.screen, (WINDOW_WIDTH, WINDOW_HEIGHT), self.display)
+        # main
+        for sprite in self.main_sprites:
+            if hasattr(sprite, 'icon'):
+                self.screen.blit(sprite.image, sprite.rect.topleft + self.offset + vector(0, -8))
+            else:
+                self.screen.blit(sprite.image, sprite.rect.topleft + self.offset)
         
\ No newline at end of file
@@ -0,0 +1,114 @@
+from settings import *
+
+# cell flags, a spike tile is both solid and a hazard
+SOLID = 1
+ONE_WAY = 2
+HAZARD = 4
+
+class CollisionGrid:
+    '''The collision flags of a level stage at tile resolution, one byte per tile in [row, column] order like the tile layers.
+    Neighbouring tiles with the same flag are merged into larger rects, bodies only test the few rects covering the cells under their probe rects.
+    Terrain that changes while the level runs (gates) updates the grid in place and tells the listeners which cells changed.'''
+    def __init__(self, width: int, height: int) -> None:
+        self.width, self.height = width, height
+        self.cells = np.zeros((height, width), dtype= np.uint8)
+        self.listeners: list[callable] = []
+        
+        # merged rects per flag and the index of the rect covering each cell, -1 for none
+        self.merged: dict[int, list[pygame.FRect | None]] = {flag: [] for flag in (SOLID, ONE_WAY, HAZARD)}
+        self.rect_ids: dict[int, np.ndarray] = {flag: np.full((height, width), -1, dtype= np.int32) for flag in self.merged}
+    
+    def mark(self, x: int, y: int, flags: int) -> None:
+        '''Add flags to the cell of a tile, the tiles are merged once every layer is marked'''
+        self.cells[y, x] |= flags
+    
+    def merge(self) -> None:
+        '''Merge the tiles of every flag across the whole map'''
+        for flag in self.merged:
+            self.merge_area(flag, 0, 0, self.width, self.height)
+    
+    def change(self, area: pygame.Rect, flags: int) -> None:
+        '''Give a block of cells new flags, area in tiles. Only the merged rects touching the block are freed and merged again.'''
+        area = area.clip((0, 0, self.width, self.height))
+        cells = self.cells[area.top:area.bottom, area.left:area.right]
+        previous = np.bitwise_or.reduce(cells, axis= None)
+        cells[:] = flags
+        for flag, rects in self.merged.items():
+            if not (previous | flags) & flag:
+                continue
+            ids = self.rect_ids[flag]
+            freed = area.copy()
+            for index in np.unique(ids[area.top:area.bottom, area.left:area.right]).tolist():
+                if index < 0:
+                    continue
+                rect = rects[index]
+                left, top = int(rect.x) // TILE_SIZE, int(rect.y) // TILE_SIZE
+                right, bottom = left + int(rect.width) // TILE_SIZE, top + int(rect.height) // TILE_SIZE
+                ids[top:bottom, left:right] = -1
+                rects[index] = None
+                freed.union_ip(left, top, right - left, bottom - top)
+            self.merge_area(flag, freed.left, freed.top, freed.right, freed.bottom)
+        
+        for listener in self.listeners:
+            listener(area)
+    
+    def subscribe(self, listener: callable) -> None:
+        '''Call a listener with the area in tiles whenever cells change'''
+        self.listeners.append(listener)
+    
+    def merge_area(self, flag: int, left: int, top: int, right: int, bottom: int) -> None:
+        '''Greedily cover the cells with the flag that no rect covers yet inside an area of the grid.
+        The first free cell in row order grows right as far as it can, then down while the whole row below it is free.
+        One-way platforms only grow right, every row of them keeps its own top to land on.'''
+        ids = self.rect_ids[flag]
+        rects = self.merged[flag]
+        free = ((self.cells[top:bottom, left:right] & flag != 0) & (ids[top:bottom, left:right] < 0)).tolist()
+        rows, cols = bottom - top, right - left
+        for row in range(rows):
+            line = free[row]
+            col = 0
+            while col < cols:
+                if not line[col]:
+                    col += 1
+                    continue
+                end = col
+                while end < cols and line[end]:
+                    end += 1
+                last = row + 1
+                if flag != ONE_WAY:
+                    while last < rows and all(free[last][col:end]):
+                        last += 1
+                for covered in range(row, last):
+                    free[covered][col:end] = [False] * (end - col)
+                ids[top + row:top + last, left + col:left + end] = len(rects)
+                rects.append(pygame.FRect((left + col) * TILE_SIZE, (top + row) * TILE_SIZE, (end - col) * TILE_SIZE, (last - row) * TILE_SIZE))
+                col = end
+    
+    def tile_area(self, rect: pygame.FRect) -> pygame.Rect:
+        '''The block of tiles a rect covers, in tiles'''
+        left, top = int(rect.left // TILE_SIZE), int(rect.top // TILE_SIZE)
+        right, bottom = int(-(-rect.right // TILE_SIZE)), int(-(-rect.bottom // TILE_SIZE))
+        return pygame.Rect(left, top, right - left, bottom - top)
+    
+    def cell_range(self, rect: pygame.FRect) -> tuple[int, int, int, int]:
+        '''Return the columns and rows a rect can touch as slice bounds clipped to the map, rects with a negative size included'''
+        left, right = sorted((rect.left, rect.right))
+        top, bottom = sorted((rect.top, rect.bottom))
+        return (max(int(left // TILE_SIZE), 0), max(int(top // TILE_SIZE), 0),
+                min(int(right // TILE_SIZE) + 1, self.width), min(int(bottom // TILE_SIZE) + 1, self.height))
+    
+    def rects(self, rect: pygame.FRect, flags: int = SOLID) -> list[pygame.FRect]:
+        '''The merged rects with any of the flags covering the cells around a rect. Not all of them have to collide with it.'''
+        left, top, right, bottom = self.cell_range(rect)
+        if left >= right or top >= bottom:
+            return []
+        found = []
+        for flag, rects in self.merged.items():
+            if flags & flag:
+                ids = np.unique(self.rect_ids[flag][top:bottom, left:right])
+                found.extend(rects[index] for index in ids.tolist() if index >= 0)
+        return found
+    
+    def collide(self, rect: pygame.FRect, flags: int = SOLID) -> bool:
+        '''True when a rect collides with a tile with any of the flags'''
+        return rect.collidelist(self.rects(rect, flags)) >= 0
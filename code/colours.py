@@ -19,28 +19,39 @@ class ColourPalette:
     sepia =     {'dark' : (111, 77, 61),    'light' : (203, 152, 103)}
     yellow =    {'dark' : (41, 43, 48),     'light' : (207, 171, 74)}
 
+def filter_colours(palette, invert= False) -> tuple[tuple, tuple]:
+    '''The colours black and white are swapped for'''
+    if invert:
+        return palette['light'], palette['dark']
+    return palette['dark'], palette['light']
+
+def indexed_palette(palette= None, invert= False) -> list[tuple]:
+    '''The 256 colours of an indexed surface, a 3-3-2 colour cube with black and white at both ends.
+    A filter only changes those two entries, so switching filters never touches the pixels.'''
+    colours = [((index >> 5) * 255 // 7, (index >> 2 & 7) * 255 // 7, (index & 3) * 255 // 3) for index in range(256)]
+    if palette is not None:
+        colours[0], colours[255] = filter_colours(palette, invert)
+    return colours
+
 def change_colours(surfaces, palette, invert= False) -> None:
-    # Convert surface to an array
+    '''Swap black and white for the colours of the palette on true colour surfaces'''
+    if palette is None:
+        return
     for surface in surfaces:
-        if palette == None:
-            break
-        else:
-            pixel_array = pygame.surfarray.pixels3d(surface)
-
-            # Define black and white as tuples (RGB)
-            black = (0, 0, 0)
-            white = (255, 255, 255)
+        # whole pixels are compared as mapped integers, subsurfaces only expose their own area
+        pixel_array = pygame.surfarray.pixels2d(surface)
+        rgb = pixel_array.dtype.type(sum(surface.get_masks()[:3]) or 0xFF)
+        colour_bits = lambda colour: pixel_array.dtype.type(surface.map_rgb(colour) & int(rgb))
 
-            # Create masks for black and white pixels
-            black_mask = np.all(pixel_array == black, axis=-1)
-            white_mask = np.all(pixel_array == white, axis=-1)
+        # what black and white turn into on this surface
+        dark, light = filter_colours(palette, invert)
+        colours = pixel_array & rgb
+        black = colours == colour_bits((0, 0, 0))
+        white = colours == colour_bits((255, 255, 255))
 
-            if invert:
-                pixel_array[black_mask] = palette['light']
-                pixel_array[white_mask] = palette['dark']
-            else:
-                pixel_array[black_mask] = palette['dark']
-                pixel_array[white_mask] = palette['light']
+        # a single pass writes both colours, the alpha bits and every other colour are left alone
+        target = black * colour_bits(dark) | white * colour_bits(light)
+        pixel_array ^= (colours ^ target) & ((black | white) * rgb)
 
-            # Update the surface
-            del pixel_array  # Unlock the surface from the array
\ No newline at end of file
+        # Update the surface
+        del pixel_array  # Unlock the surface from the array
@@ -1,25 +1,28 @@
 import pygame
+from os.path import join
+from text import get_glyph_atlas
 pygame.init()
-font = pygame.font.Font(None, 30)
+# a pixel font, so the values that change every frame are drawn from cached glyphs
+font = pygame.font.Font(join('.', 'assets', 'fonts', '8_regular.ttf'), 16)
 
 def debug(info, x: int= 10, y: int= 40):
     display_surface = pygame.display.get_surface()
-    debug_text = font.render(str(info), True, 'white')
-    debug_rect = debug_text.get_rect(topleft= (x, y))
+    glyphs = get_glyph_atlas(font)
+    debug_rect = pygame.Rect((x, y), glyphs.size(str(info)))
     pygame.draw.rect(display_surface, 'black', debug_rect)
-    display_surface.blit(debug_text, debug_rect)
+    glyphs.draw(display_surface, str(info), 'white', debug_rect.topleft)
 
 def debug_multiple(items: list, x: int= 10, y: int= 40) -> None:
     display_surface = pygame.display.get_surface()
+    glyphs = get_glyph_atlas(font)
     for idx, item in enumerate(items):
-        debug_text = font.render(str(item), True, 'White')
-        debug_rect = debug_text.get_rect(topleft = (x, y + (idx * 30)))
+        debug_rect = pygame.Rect((x, y + (idx * font.get_linesize())), glyphs.size(str(item)))
         pygame.draw.rect(display_surface, 'Black', debug_rect)
-        display_surface.blit(debug_text, debug_rect)
+        glyphs.draw(display_surface, str(item), 'White', debug_rect.topleft)
 
 def show_fps(info, x: int= 10, y: int= 10):
     display_surface = pygame.display.get_surface()
-    debug_text = font.render(f'FPS: {info:.2f}', True, 'white')
-    debug_rect = debug_text.get_rect(topleft= (x, y))
+    glyphs = get_glyph_atlas(font)
+    debug_rect = pygame.Rect((x, y), glyphs.size(f'FPS: {info:.2f}'))
     pygame.draw.rect(display_surface, 'black', debug_rect)
-    display_surface.blit(debug_text, debug_rect)
\ No newline at end of file
+    glyphs.draw(display_surface, f'FPS: {info:.2f}', 'white', debug_rect.topleft)
\ No newline at end of file
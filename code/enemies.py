@@ -19,8 +19,6 @@ class Enemy(pygame.sprite.Sprite):
         self.state, self.facing_right = 'idle', True
         self.image = self.frames[self.state][self.frame_index]
         
-        self.mask = pygame.mask.from_surface(self.image)
-        
         self.rect = self.image.get_frect(topleft= position)
         self.old_rect = self.rect.copy()
         self.z = Z_LAYERS['main']
@@ -36,13 +34,13 @@ class Enemy(pygame.sprite.Sprite):
 # ENEMY TYPES
 class Chaser(Enemy):
     '''Chaser enemy is asleep until player near, moves towards player if on level, stops near edges & walls'''
-    def __init__(self, position, frames, groups, collision_sprites, player) -> None:
+    def __init__(self, position, frames, groups, collision_grid, player) -> None:
         super().__init__(position, frames, groups)
         self.hitbox_rect = self.rect.inflate(-4, 0)
         self.old_rect = self.hitbox_rect.copy()
         self.speed = 32
         
-        self.collision_rects = [sprite.rect for sprite in collision_sprites]
+        self.collision_grid = collision_grid
         self.player = player
         
         self.player_near = {'x': False, 'y': False}
@@ -69,9 +67,9 @@ class Chaser(Enemy):
         floor_rect_left = pygame.FRect((self.hitbox_rect.bottomleft + vector(-2, 0)), (2, 2))
         wall_rect = pygame.FRect((self.hitbox_rect.topleft + vector(-2, 0)), (self.hitbox_rect.width + 4, 2))
         
-        if floor_rect_right.collidelist(self.collision_rects) < 0 and self.direction.x > 0 or\
-            floor_rect_left.collidelist(self.collision_rects) < 0 and self.direction.x < 0 or\
-            wall_rect.collidelist(self.collision_rects) != -1:
+        if not self.collision_grid.collide(floor_rect_right) and self.direction.x > 0 or\
+            not self.collision_grid.collide(floor_rect_left) and self.direction.x < 0 or\
+            self.collision_grid.collide(wall_rect):
             self.timers['edge'].start()
             self.hitbox_rect.move_ip(-1, 0) if self.direction.x > 0 else self.hitbox_rect.move_ip(1, 0)
     
@@ -101,10 +99,8 @@ class Chaser(Enemy):
     def animate(self, dt) -> None:
         '''The animation method'''
         self.frame_index += ANIMATION_SPEED * dt
-        self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
-        self.image = pygame.transform.flip(self.image, True, False) if self.direction.x < 0 else self.image
-        
-        self.mask = pygame.mask.from_surface(self.image)
+        frames = self.frames[self.state].variant(flip_x= self.direction.x < 0)
+        self.image = frames[int(self.frame_index % len(frames))]
     
     def update(self, dt) -> None:
         '''The update method'''
@@ -120,7 +116,7 @@ class Chaser(Enemy):
 
 class Crawler(Enemy):
     '''Crawler enemy moves around on surfaces endlessly'''
-    def __init__(self, position, frames, groups, collision_sprites) -> None:
+    def __init__(self, position, frames, groups, collision_grid) -> None:
         super().__init__(position, frames, groups)
         self.hitbox_rect = self.rect.inflate(0, 0)
         self.old_rect = self.hitbox_rect.copy()
@@ -128,7 +124,7 @@ class Crawler(Enemy):
         self.direction = vector(1, 0)
         self.state = 'walk'
         
-        self.collision_rects = [sprite.rect for sprite in collision_sprites]
+        self.collision_grid = collision_grid
         
         self.on_surface = {'bottom': False, 'top': False, 'left': False, 'right': False}
         self.rotate = {'left': False, 'right': False}
@@ -140,10 +136,10 @@ class Crawler(Enemy):
         left_rect = pygame.FRect((self.rect.topleft + vector(-1, 0)), (1, self.rect.height))
         right_rect = pygame.FRect((self.rect.topright), (1, self.rect.height))
         
-        self.on_surface['bottom'] = True if bottom_rect.collidelist(self.collision_rects) >= 0 else False
-        self.on_surface['top'] = True if top_rect.collidelist(self.collision_rects) >= 0 else False
-        self.on_surface['left'] = True if left_rect.collidelist(self.collision_rects) >= 0 else False
-        self.on_surface['right'] = True if right_rect.collidelist(self.collision_rects) >= 0 else False
+        self.on_surface['bottom'] = self.collision_grid.collide(bottom_rect)
+        self.on_surface['top'] = self.collision_grid.collide(top_rect)
+        self.on_surface['left'] = self.collision_grid.collide(left_rect)
+        self.on_surface['right'] = self.collision_grid.collide(right_rect)
     
     def move(self, dt) -> None:
         '''The movement method'''
@@ -177,13 +173,10 @@ class Crawler(Enemy):
     def animate(self, dt) -> None:
         '''The animation method'''
         self.frame_index += (ANIMATION_SPEED + 3) * dt
-        self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
-        
-        self.image = pygame.transform.rotate(self.image, 90) if self.rotate['left'] else self.image
-        self.image = pygame.transform.rotate(self.image, -90) if self.rotate['right'] else self.image
-        self.image = pygame.transform.flip(self.image, True, True) if self.on_surface['top'] else self.image
-        
-        self.mask = pygame.mask.from_surface(self.image)
+        # turned upside down on ceilings
+        angle = (90 if self.rotate['left'] else 0) - (90 if self.rotate['right'] else 0) + (180 if self.on_surface['top'] else 0)
+        frames = self.frames[self.state].variant(angle= angle)
+        self.image = frames[int(self.frame_index % len(frames))]
     
     def update(self, dt) -> None:
         '''The update method'''
@@ -240,10 +233,8 @@ class Floater(Enemy):
     def animate(self, dt) -> None:
         '''The animation method'''
         self.frame_index += ANIMATION_SPEED * dt
-        self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
-        self.image = pygame.transform.flip(self.image, True, False) if not self.facing_right else self.image
-        
-        self.mask = pygame.mask.from_surface(self.image)
+        frames = self.frames[self.state].variant(flip_x= not self.facing_right)
+        self.image = frames[int(self.frame_index % len(frames))]
     
     def update(self, dt) -> None:
         '''The update method'''
@@ -287,9 +278,7 @@ class Shooter(Enemy):
         '''The animation method'''
         self.frame_index += (ANIMATION_SPEED + 2) * dt
         if self.frame_index < len(self.frames[self.state]):
-            self.image = self.frames[self.state][int(self.frame_index)]
-            self.image = pygame.transform.flip(self.image, True, False) if not self.facing_right else self.image
-            self.mask = pygame.mask.from_surface(self.image)
+            self.image = self.frames[self.state].variant(flip_x= not self.facing_right)[int(self.frame_index)]
             # fire
             if self.state == 'shoot' and int(self.frame_index) == len(self.frames[self.state]) - 1 and not self.has_fired:
                 self.create_projectile(self.rect.topright, 1 if self.facing_right else -1)
@@ -313,7 +302,7 @@ class Shooter(Enemy):
 
 class Skipper(Enemy):
     '''Skipper enemy is jumping around the level endlessly, has full collision with all surfaces'''
-    def __init__(self, position, frames, groups, collision_sprites) -> None:
+    def __init__(self, position, frames, groups, collision_grid) -> None:
         super().__init__(position, frames, groups)
     
     def update(self, dt) -> None:
@@ -321,7 +310,7 @@ class Skipper(Enemy):
 
 class Walker(Enemy):
     '''Walker enemy walks around left and right and turns around on edges and walls'''
-    def __init__(self, position, frames, groups, collision_sprites) -> None:
+    def __init__(self, position, frames, groups, collision_grid) -> None:
         super().__init__(position, frames, groups)
         
         self.hitbox_rect = self.rect.inflate(-6, 0)
@@ -329,7 +318,7 @@ class Walker(Enemy):
         self.speed = 16
         self.direction = vector(choice((-1, 1)), 0)
         self.state = 'walk'
-        self.collision_rects = [sprite.rect for sprite in collision_sprites]
+        self.collision_grid = collision_grid
         
         self.health = 3
         
@@ -354,9 +343,9 @@ class Walker(Enemy):
         floor_rect_left = pygame.FRect(self.hitbox_rect.bottomleft, (-1, 1))
         wall_rect = pygame.FRect(self.hitbox_rect.topleft + vector(-1, 0), (self.hitbox_rect.width + 2, 1))
         
-        if floor_rect_right.collidelist(self.collision_rects) < 0 and self.direction.x > 0 or\
-            floor_rect_left.collidelist(self.collision_rects) < 0 and self.direction.x < 0 or\
-            wall_rect.collidelist(self.collision_rects) != -1:
+        if not self.collision_grid.collide(floor_rect_right) and self.direction.x > 0 or\
+            not self.collision_grid.collide(floor_rect_left) and self.direction.x < 0 or\
+            self.collision_grid.collide(wall_rect):
             self.direction.x *= -1
     
     def change_direction(self) -> None:
@@ -376,10 +365,8 @@ class Walker(Enemy):
         '''Animate movement'''
         self.frame_index += self.animation_speed * dt
         
-        self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
-        self.image = pygame.transform.flip(self.image, True, False) if self.direction.x < 0 else self.image
-        
-        self.mask = pygame.mask.from_surface(self.image)
+        frames = self.frames[self.state].variant(flip_x= self.direction.x < 0)
+        self.image = frames[int(self.frame_index % len(frames))]
     
     def update_timers(self) -> None:
         for timer in self.timers.values():
@@ -99,8 +99,8 @@ class Golem(pygame.sprite.Sprite):
         if self.state in ('left_hammer', 'right_punch','ground_pound') and int(self.frame_index) > len(self.frames[self.state]) -1:
             self.state = 'idle'
         
-        self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
-        self.image = pygame.transform.flip(self.image, True, False) if not self.facing_right else self.image
+        frames = self.frames[self.state].variant(flip_x= not self.facing_right)
+        self.image = frames[int(self.frame_index % len(frames))]
     
     def update_timers(self) -> None:
         for timer in self.timers.values():
@@ -117,11 +117,12 @@ class Golem(pygame.sprite.Sprite):
         self.animate(dt)
 
 class Boulder(pygame.sprite.Sprite):
-    def __init__(self, position, surface, groups, direction, speed) -> None:
+    def __init__(self, position, frames, groups, direction, speed) -> None:
         self.boss_projectile = True
         super().__init__(groups)
         
-        self.image = surface
+        self.frames, self.angle = frames, 0
+        self.image = self.frames[0]
         self.rect = self.image.get_frect(topleft= position)
         self.direction = direction
         self.speed = speed
@@ -134,7 +135,8 @@ class Boulder(pygame.sprite.Sprite):
         self.timers['lifetime'].start()
     
     def rotate(self) -> None:
-        self.image = pygame.transform.rotate(self.image, 90)
+        self.angle = (self.angle + 90) % 360
+        self.image = self.frames.variant(angle= self.angle)[0]
     
     def update(self, dt) -> None:
         for timer in self.timers.values():
@@ -146,11 +148,12 @@ class Boulder(pygame.sprite.Sprite):
             self.kill()
 
 class Spike(pygame.sprite.Sprite):
-    def __init__(self, position, surface, groups, direction, speed) -> None:
+    def __init__(self, position, frames, groups, direction, speed) -> None:
         self.boss_projectile = True
         super().__init__(groups)
         
-        self.image = surface
+        self.frames, self.angle = frames, 0
+        self.image = self.frames[0]
         self.rect = self.image.get_frect(topleft= position)
         self.direction = direction
         self.speed = speed
@@ -163,7 +166,8 @@ class Spike(pygame.sprite.Sprite):
         self.timers['lifetime'].start()
     
     def rotate(self) -> None:
-        self.image = pygame.transform.rotate(self.image, 90)
+        self.angle = (self.angle + 90) % 360
+        self.image = self.frames.variant(angle= self.angle)[0]
     
     def update(self, dt) -> None:
         for timer in self.timers.values():
@@ -33,6 +33,27 @@ class GameData:
         
         # PAUSE/RESUME
         self.paused: bool = False
+        
+        # told about every change to health, coins and gems, not saved
+        self.listeners: list[callable] = []
+    
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['listeners'] = []
+        state.pop('ui', None)
+        return state
+    
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.listeners = []
+    
+    def subscribe(self, listener: callable) -> None:
+        '''Call listener(name, value) whenever health, coins or gems change'''
+        self.listeners.append(listener)
+    
+    def notify(self, name: str, value: int) -> None:
+        for listener in self.listeners:
+            listener(name, value)
     
     # player health
     @property
@@ -41,7 +62,9 @@ class GameData:
     
     @health.setter
     def health(self, value: int) -> None:
-        self._health = value
+        if value != self._health:
+            self._health = value
+            self.notify('health', value)
 
     # player coins
     @property
@@ -50,7 +73,9 @@ class GameData:
     
     @coins.setter
     def coins(self, value: int):
-        self._coins = value
+        if value != self._coins:
+            self._coins = value
+            self.notify('coins', value)
     
     # player gems
     @property
@@ -59,4 +84,6 @@ class GameData:
     
     @gems.setter
     def gems(self, value: int) -> None:
-        self._gems = value
\ No newline at end of file
+        if value != self._gems:
+            self._gems = value
+            self.notify('gems', value)
\ No newline at end of file
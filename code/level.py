@@ -2,21 +2,35 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from gdata import GameData
-    from pytmx import TiledMap
+    from tilemap import CompiledMap
 
 from settings import *
+from support import collide_mask
+from animation import animation_clocks, tile_animation
 from camera import CameraGroup
+from collision import CollisionGrid, SOLID, ONE_WAY, HAZARD
+from spatial import Broadphase
 from gtimer import Timer
 from pause import PauseScreen
-from sprites import Sprite, MovingSprite, Door, Item, Floor, Platform, VFX, Lever, ExprBubble
+from sprites import Sprite, MovingSprite, Door, Item, VFX, Lever, ExprBubble
 
 from npc import Creature, Snail
 from enemies import Chaser, Crawler, Floater, Shooter, Skipper, Walker, Thorn
 from enemy_boss import Golem, Boulder, Spike
 from player import Player, Arrow
 
+def level_manifest(tmx_map: CompiledMap) -> set[str]:
+    '''Names of the level frame sets used by the objects placed in a tmx map, objects drawn with their tile image are listed too'''
+    # player, effects, projectiles and the items shown in the pause screen are used by every level
+    names = {'player', 'vfx', 'interact', 'arrow', 'items'}
+    for layer in ['npc', 'objects', 'moving_objects', 'enemies']:
+        names.update(obj.name for obj in tmx_map.get_layer_by_name(layer) if obj.name)
+    if 'golem' in names:
+        names.add('boulder')
+    return names
+
 class Level:
-    def __init__(self, tmx_map: TiledMap, level_frames: dict, data: GameData, fonts: dict, switch_stage: callable) -> None:
+    def __init__(self, tmx_map: CompiledMap, level_frames: dict, data: GameData, fonts: dict, switch_stage: callable) -> None:
         self.display = pygame.display.get_surface()
         self.data = data
         self.switch_stage = switch_stage
@@ -27,9 +41,6 @@ class Level:
         tmx_level_properties = tmx_map.get_layer_by_name('data')[0].properties
         self.level_unlock = tmx_level_properties['level_unlock']
         
-        # pause screen
-        self.pause_menu = PauseScreen(level_frames['items'], fonts, self.data)
-        
         # all sprites
         self.all_sprites = CameraGroup(
             width= tmx_map.width,
@@ -37,9 +48,10 @@ class Level:
             data= data
         )
         
-        self.collision_sprites = pygame.sprite.Group()          # floor
-        self.semi_collision_sprites = pygame.sprite.Group()     # platforms, moving platforms
-        self.damage_sprites = pygame.sprite.Group()             # anything that damages player
+        self.collision_sprites = pygame.sprite.Group()          # solid objects that aren't tiles, hit by arrows
+        self.terrain_sprites = pygame.sprite.Group()            # terrain and spike tiles, hit by arrows
+        self.semi_collision_sprites = pygame.sprite.Group()     # moving platforms
+        self.damage_sprites = pygame.sprite.Group()             # anything but spike tiles that damages player, those are hazard cells
         self.snail_collision_sprites = pygame.sprite.Group()    # snails
         self.enemy_sprites = pygame.sprite.Group()              # enemies
         self.projectile_sprites = pygame.sprite.Group()         # player projectiles
@@ -48,43 +60,80 @@ class Level:
         
         self.interaction_sprites = pygame.sprite.Group()        # interactibles
         
-        self.setup(tmx_map, level_frames)
+        # the sprites that move or come and go, bucketed again every frame before the collision checks
+        self.broadphase = Broadphase({
+            'enemy': self.enemy_sprites,
+            'projectile': self.projectile_sprites,
+            'damage': self.damage_sprites,
+            'item': self.item_sprites,
+            'interactable': self.interaction_sprites
+        })
+        
+        # terrain, spike and platform tiles and the gate, shared by everything that collides with the level
+        self.collision_grid = CollisionGrid(tmx_map.width, tmx_map.height)
+        self.collision_grid.subscribe(self.terrain_changed)
+        self.terrain_tiles: dict[tuple[int, int], Sprite] = {}
+        self.cleared_tiles: dict[tuple[int, int], Sprite] = {}  # terrain tiles taken away, kept for when their cell is solid again
         
         # frames
         self.vfx_frames = level_frames['vfx']
         self.interact_frames = level_frames['interact']
         self.arrow_frames = level_frames['arrow']
         
-        # boss projectiles
-        self.boss_boulder = level_frames['boulder']
-        
         # timers
         self.timers = {
             'interaction_wait': Timer(1000)
         }
+        
+        # the level is built a slice at a time by iterating the builder, it can run once it is exhausted
+        self.builder = self.build(tmx_map, level_frames, fonts)
+    
+    def build(self, tmx_map: CompiledMap, level_frames: dict, fonts: dict):
+        '''Create the pause screen and the level sprites, yielding between the slow steps'''
+        self.pause_menu = PauseScreen(level_frames['items'], fonts, self.data)
+        yield
+        yield from self.setup(tmx_map, level_frames)
     
-    def setup(self, tmx_map: TiledMap, level_frames: dict) -> None:
-        '''Read tile and object layers from tmx map file'''
+    def setup(self, tmx_map: CompiledMap, level_frames: dict):
+        '''Read tile and object layers from tmx map file, yields after each layer and every 128 tiles'''
         
-        # tiles
+        # tiles, drawn from pre-rendered chunks while the tile sprites are only used for collision
+        tile_frames = {}
         for layer in ['bg', 'terrain', 'terrain_hidden', 'platform', 'spike']:
-            for x, y, surface in tmx_map.get_layer_by_name(layer).tiles():
+            z = Z_LAYERS['bg_tiles'] if layer == 'bg' else Z_LAYERS['main']
+            for index, (x, y, gid) in enumerate(tmx_map.get_layer_by_name(layer)):
+                if not gid:
+                    continue
+                if index % 128 == 127:
+                    yield
+                surface = tmx_map.get_tile_image_by_gid(gid)
+                clock = tile_animation(tmx_map, gid, tile_frames)
+                if clock:
+                    self.all_sprites.add_animated_tile((x * TILE_SIZE, y * TILE_SIZE), clock, z)
+                else:
+                    self.all_sprites.bake_tile((x * TILE_SIZE, y * TILE_SIZE), surface, z)
                 if layer == 'terrain':
-                    Floor((x * TILE_SIZE, y * TILE_SIZE), surface, (self.all_sprites, self.collision_sprites))
+                    self.terrain_tiles[(x, y)] = Sprite((x * TILE_SIZE, y * TILE_SIZE), surface, self.terrain_sprites)
+                    self.collision_grid.mark(x, y, SOLID)
+                    self.all_sprites.minimap.mark_tile(x, y, 'white')
                 if layer == 'terrain_hidden':
-                    Floor((x * TILE_SIZE, y * TILE_SIZE), surface, (self.all_sprites, self.collision_sprites), hidden=True)
+                    self.terrain_tiles[(x, y)] = Sprite((x * TILE_SIZE, y * TILE_SIZE), surface, self.terrain_sprites)
+                    self.collision_grid.mark(x, y, SOLID)
                 if layer == 'platform':
-                    Platform((x * TILE_SIZE, y * TILE_SIZE), surface, (self.all_sprites, self.semi_collision_sprites))
+                    self.collision_grid.mark(x, y, ONE_WAY)
+                    self.all_sprites.minimap.mark_tile(x, y, 'gray')
                 if layer == 'spike':
-                    Sprite((x * TILE_SIZE, y * TILE_SIZE), surface, (self.all_sprites, self.collision_sprites, self.damage_sprites))
-                else:
-                    # bg
-                    Sprite((x * TILE_SIZE, y * TILE_SIZE), surface, self.all_sprites, Z_LAYERS['bg_tiles'])
+                    self.terrain_tiles[(x, y)] = Sprite((x * TILE_SIZE, y * TILE_SIZE), surface, self.terrain_sprites)
+                    self.collision_grid.mark(x, y, SOLID | HAZARD)
+            yield
+        self.collision_grid.merge()
+        yield
         
         # NPC
         for obj in tmx_map.get_layer_by_name('npc'):
             if obj.name == 'snail':
-                Snail((obj.x, obj.y), level_frames['snail'], (self.all_sprites, self.snail_collision_sprites), self.collision_sprites)
+                Snail((obj.x, obj.y), level_frames['snail'], (self.all_sprites, self.snail_collision_sprites), self.collision_grid)
+        yield
         
         # objects
         for obj in tmx_map.get_layer_by_name('objects'):
@@ -92,7 +141,7 @@ class Level:
                 self.player = Player(
                     position= (obj.x, obj.y),
                     groups= self.all_sprites,
-                    collision_sprites= self.collision_sprites,
+                    collision_grid= self.collision_grid,
                     semi_collision_sprites= self.semi_collision_sprites,
                     snail_sprites= self.snail_collision_sprites,
                     frames= level_frames['player'],
@@ -103,10 +152,12 @@ class Level:
                 self.door  = Door((obj.x, obj.y), level_frames['door'], (self.all_sprites, self.interaction_sprites))
             elif obj.name == 'gate':
                 self.gate = Sprite((obj.x, obj.y), obj.image, (self.all_sprites, self.collision_sprites))
+                self.change_terrain(self.collision_grid.tile_area(self.gate.rect), SOLID)
             elif obj.name == 'lever':
                 self.lever = Lever((obj.x, obj.y), obj.image, (self.all_sprites, self.interaction_sprites), obj.properties['linked_object'])
             elif obj.name == 'chest':
                 self.chest = Sprite((obj.x, obj.y), level_frames['chest'][0], self.all_sprites, Z_LAYERS['bg_tiles'])
+        yield
         
         # moving objects
         for obj in tmx_map.get_layer_by_name('moving_objects'):
@@ -122,29 +173,42 @@ class Level:
                 end_pos = (obj.x + obj.width / 2, obj.y + obj.height)
             speed = obj.properties['speed']
             MovingSprite(frames, groups, start_pos, end_pos, move_direction, speed)
+        yield
         
         # enemies
         for obj in tmx_map.get_layer_by_name('enemies'):
             if obj.name in ['skeleton', 'zombie']:
-                Walker((obj.x, obj.y), level_frames[obj.name], (self.all_sprites, self.enemy_sprites), self.collision_sprites)
+                Walker((obj.x, obj.y), level_frames[obj.name], (self.all_sprites, self.enemy_sprites), self.collision_grid)
             if obj.name == 'crawler':
-                Crawler((obj.x, obj.y), level_frames['crawler'], (self.all_sprites, self.enemy_sprites), self.collision_sprites)
+                Crawler((obj.x, obj.y), level_frames['crawler'], (self.all_sprites, self.enemy_sprites), self.collision_grid)
             if obj.name in ['shadowman', 'horn']:
-                Chaser((obj.x, obj.y), level_frames[obj.name], (self.all_sprites, self.enemy_sprites), self.collision_sprites, self.player)
+                Chaser((obj.x, obj.y), level_frames[obj.name], (self.all_sprites, self.enemy_sprites), self.collision_grid, self.player)
             if obj.name == 'ghost':
                 Floater((obj.x, obj.y), level_frames['ghost'], (self.all_sprites, self.enemy_sprites), self.player)
             if obj.name == 'golem':
+                # boss projectiles
+                self.boss_boulder = level_frames['boulder']
                 Golem((obj.x, obj.y), level_frames['golem'], (self.all_sprites, self.enemy_sprites), self.create_boss_boulder, self.create_boss_spike, self.player)
             if obj.name == 'plant':
                 Shooter((obj.x, obj.y), level_frames['plant'], (self.all_sprites, self.enemy_sprites), self.player, self.create_enemy_projectile)
+        yield
         
         # items
         for obj in tmx_map.get_layer_by_name('items'):
             Item(obj.name, (obj.x + TILE_SIZE / 2, obj.y + TILE_SIZE / 2), level_frames['items'][obj.name], (self.all_sprites, self.item_sprites), self.data)
     
+    def start(self) -> None:
+        '''Restart the timers sprites started while the level was built, it may have been waiting in the background since'''
+        for sprite in self.all_sprites:
+            for timer in getattr(sprite, 'timers', {}).values():
+                if timer.active:
+                    timer.start()
+    
     def check_interactions(self) -> None:
+        near = self.broadphase.query('interactable', self.player.hitbox_rect)
+        
         # door
-        if self.player.hitbox_rect.colliderect(self.door.rect):
+        if self.door in near and self.player.hitbox_rect.colliderect(self.door.rect):
             if not self.data.key:
                 ExprBubble(self.player.hitbox_rect.midtop + vector(-8, -16), self.interact_frames, self.all_sprites, '?')
                 if self.player.interaction['do']:
@@ -156,17 +220,42 @@ class Level:
                     self.switch_stage('overworld', self.level_unlock)
         
         # lever
-        if hasattr(self, 'lever'):
+        if hasattr(self, 'lever') and self.lever in near:
             if self.player.hitbox_rect.colliderect(self.lever.rect) and not self.lever.activated:
                 ExprBubble(self.player.hitbox_rect.midtop + vector(-8, -16), self.interact_frames, self.all_sprites, '!')
                 if self.player.interaction['do'] and not self.lever.activated:
                     self.lever.activated = True
                     linked_obj = getattr(self, self.lever.linked_object)
                     linked_obj.kill()
+                    self.change_terrain(self.collision_grid.tile_area(linked_obj.rect), 0)
             
     
+    def change_terrain(self, area: pygame.Rect, flags: int) -> None:
+        '''Set the collision flags of a block of tiles while the level runs, for gates, hidden terrain and destructible blocks.
+        The area is in tiles, flags of 0 clear it. The map's tiles in the area are only drawn while their cell has flags,
+        cells without a tile of their own, like those under the gate, are invisible colliders.'''
+        self.collision_grid.change(area, flags)
+    
+    def terrain_changed(self, area: pygame.Rect) -> None:
+        '''Keep the minimap, the baked tiles and the tiles arrows hit in step with the collision grid'''
+        visibility = {}
+        for x in range(area.left, area.right):
+            for y in range(area.top, area.bottom):
+                flags = int(self.collision_grid.cells[y, x])
+                self.all_sprites.minimap.mark_tile(x, y, 'white' if flags & SOLID else 'gray' if flags & ONE_WAY else 'black')
+                visibility[(x * TILE_SIZE, y * TILE_SIZE)] = bool(flags)
+                if not flags & SOLID and (x, y) in self.terrain_tiles:
+                    tile = self.cleared_tiles[(x, y)] = self.terrain_tiles.pop((x, y))
+                    tile.kill()
+                elif flags & SOLID and (x, y) in self.cleared_tiles:
+                    tile = self.terrain_tiles[(x, y)] = self.cleared_tiles.pop((x, y))
+                    tile.add(self.terrain_sprites)
+        self.all_sprites.show_tiles(visibility, Z_LAYERS['main'])
+    
     def melee_collision(self) -> None:
-        for target in self.enemy_sprites:
+        if not self.player.melee_atk:
+            return
+        for target in self.broadphase.query('enemy', self.player.rect):
             facing_target = self.player.rect.centerx < target.rect.centerx and self.player.facing_right or\
                             self.player.rect.centerx > target.rect.centerx and not self.player.facing_right
             if target.hitbox_rect.colliderect(self.player.rect) and self.player.melee_atk and facing_target and int(self.player.frame_index) in (3, 4):
@@ -174,14 +263,30 @@ class Level:
                 VFX(target.rect.center, self.vfx_frames['punch'], self.all_sprites)
     
     def ranged_collision(self) -> None:
-        groups = self.collision_sprites.sprites() + self.enemy_sprites.sprites()
-        for sprite in groups:
-            collision = pygame.sprite.spritecollide(sprite, self.projectile_sprites, False, pygame.sprite.collide_mask)
-            if collision:
-                if hasattr(sprite, 'enemy') and sprite.state != 'death':
-                    sprite.take_hit()
-                VFX((collision[0].rect.midleft if collision[0].direction < 0 else collision[0].rect.midright), self.vfx_frames['particle'], self.all_sprites)
-                collision[0].kill()
+        if not self.projectile_sprites:
+            return
+        # every sprite stops at most one projectile a frame, the terrain before the enemies
+        hit = set()
+        for projectile in self.projectile_sprites.sprites():
+            area = self.collision_grid.tile_area(projectile.rect)
+            tiles = [self.terrain_tiles[(x, y)] for y in range(area.top, area.bottom) for x in range(area.left, area.right) if (x, y) in self.terrain_tiles]
+            for sprite in tiles + self.collision_sprites.sprites():
+                if self.projectile_hit(sprite, projectile, hit):
+                    break
+        for projectile, sprite in self.broadphase.pairs('projectile', 'enemy'):
+            if projectile.alive():
+                self.projectile_hit(sprite, projectile, hit)
+    
+    def projectile_hit(self, sprite, projectile, hit: set) -> bool:
+        '''Stop a projectile on a sprite it hits, the masks are only compared when the rects collide'''
+        if sprite in hit or not sprite.rect.colliderect(projectile.rect) or not collide_mask(sprite, projectile):
+            return False
+        hit.add(sprite)
+        if hasattr(sprite, 'enemy') and sprite.state != 'death':
+            sprite.take_hit()
+        VFX((projectile.rect.midleft if projectile.direction < 0 else projectile.rect.midright), self.vfx_frames['particle'], self.all_sprites)
+        projectile.kill()
+        return True
     
     def create_projectile(self, position, direction) -> None:
         Arrow(position, self.arrow_frames, (self.all_sprites, self.projectile_sprites), direction, 128)
@@ -195,9 +300,29 @@ class Level:
     def create_boss_spike(self, position, direction) -> None:
         Spike(position, self.boss_boulder, (self.all_sprites, self.damage_sprites), direction, 64)
     
+    def damage_collision(self) -> None:
+        '''Hurt the player with the first damaging sprite or hazard tile it touches, enemy projectiles break on the player.
+        Nothing is tested while the player is still invulnerable from the last hit.'''
+        if self.player.timers['hit'].active:
+            return
+        hitbox = self.player.hitbox_rect
+        for sprite in self.broadphase.query('damage', hitbox):
+            if sprite.rect.colliderect(hitbox) and (not DAMAGE_MASKS or collide_mask(self.player, sprite)):
+                self.player.take_hit(sprite.rect)
+                if sprite in self.enemy_projectile_sprites:
+                    sprite.kill()
+                return
+        
+        # hazard tiles are solid, the player only ever stands next to them
+        hurtbox = hitbox.inflate(2, 2)
+        hazards = self.collision_grid.rects(hurtbox, HAZARD)
+        index = hurtbox.collidelist(hazards)
+        if index >= 0:
+            self.player.take_hit(hazards[index])
+    
     def item_collision(self) -> None:
         if self.item_sprites:
-            for sprite in self.item_sprites:
+            for sprite in self.broadphase.query('item', self.player.hitbox_rect):
                 if sprite.rect.colliderect(self.player.hitbox_rect):
                     sprite.activate()
                     VFX((sprite.rect.center), self.vfx_frames['sparkle'] if sprite.item_type == 'key' else self.vfx_frames['particle'], self.all_sprites)
@@ -219,15 +344,18 @@ class Level:
         self.pause_game()
         if not self.data.paused:
             self.update_timers()
+            animation_clocks.update(dt, self)
             self.all_sprites.update(dt)
-            #self.data.ui.sprites.update(dt)
+            self.broadphase.update()
             
             self.melee_collision()
             self.ranged_collision()
+            self.damage_collision()
             self.item_collision()
             
             self.check_interactions()
             
             self.all_sprites.draw(self.player.hitbox_rect, dt)
+            self.data.ui.update(dt)
         else:
             self.pause_menu.run(dt)
\ No newline at end of file
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from gdata import GameData
+    from level import Level
+
+from settings import *
+from animation import animation_clocks
+from text import text_cache
+from time import perf_counter
+
+def build_level(level: Level, budget: float) -> bool:
+    '''Run the level builder for up to budget seconds, returns True once the level is complete'''
+    end = perf_counter() + budget
+    with animation_clocks.using(level):
+        for _ in level.builder:
+            if perf_counter() >= end:
+                return False
+    return True
+
+class LoadingScreen:
+    '''Shown while a level is built a slice every frame, hands the level over once it is complete'''
+    def __init__(self, level: Level, fonts: dict, data: GameData, start_stage: callable, budget: float = 0.008) -> None:
+        self.screen = data.screen
+        self.level = level
+        self.fonts = fonts
+        self.start_stage = start_stage
+        self.budget = budget
+        self.time = 0
+
+    def show_loading_text(self) -> None:
+        '''Display loading label with dots counting up'''
+        dots = '.' * (int(self.time * 4) % 4)
+        text = text_cache.render(self.fonts['bold'], f'LOADING{dots}', False, 'white')
+        self.screen.blit(text, (self.screen.get_width() / 2 - self.fonts['bold'].size('LOADING')[0] / 2,
+                                self.screen.get_height() / 2 - text.get_height() / 2))
+
+    def run(self, dt) -> None:
+        '''Build the next slice of the level, or start it when it is done'''
+        if build_level(self.level, self.budget):
+            self.level.start()
+            self.start_stage(self.level)
+            self.level.run(dt)
+            return
+
+        self.time += dt
+        self.screen.fill('black')
+        self.show_loading_text()
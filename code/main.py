@@ -1,14 +1,13 @@
-from __future__ import annotations
-from typing import TYPE_CHECKING
-if TYPE_CHECKING:
-    from pytmx import TiledMap
-
 from settings import *
 from support import *
+from bundle import AssetBundle, FrameSets
 from debug import debug_multiple, show_fps
-from colours import ColourPalette, change_colours
-from level import Level
+from colours import ColourPalette
+from level import Level, level_manifest
+from loading import LoadingScreen, build_level
+from tilemap import CompiledMap
 from overworld import Overworld
+from present import Presenter
 from gdata import GameData
 from ui import UI
 
@@ -20,30 +19,34 @@ class Game:
         self.clock = pygame.time.Clock()
         self.display = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         self.game_screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.presenter = Presenter(self.display, self.game_screen)
         
         self.import_assets()
         
-        self.ui = UI(pygame.font.Font(None, 16), self.ui_frames)
         self.data = GameData(self.game_screen)
         
         # load save file if any
         self.load_game()
         
-        # level stages
+        # the HUD is reached through the game data by the level stages
+        self.ui = self.data.ui = UI(self.fonts['regular'], self.ui_frames, self.data)
+        
+        # level stages, the maps are compiled and loaded when their stage starts
         self.tmx_maps = {
-            0: load_pygame(join('.', 'data', 'levels', 'test.tmx')),
-            1: load_pygame(join('.', 'data', 'levels', 'boss.tmx'))
+            0: join('.', 'data', 'levels', 'test.tmx'),
+            1: join('.', 'data', 'levels', 'boss.tmx')
         }
         # game overworld
-        self.tmx_overworld = load_pygame(join('.', 'data', 'overworld', 'overworld_test.tmx'))
+        self.tmx_overworld = join('.', 'data', 'overworld', 'overworld_test.tmx')
         # main menu
-        self.main_menu = load_pygame(join('.', 'data', 'overworld', 'main_menu.tmx'))
+        self.main_menu = join('.', 'data', 'overworld', 'main_menu.tmx')
         # settings level stage
         ...
         
         # load stage
-        self.current_stage = Level(self.tmx_maps[0], self.level_frames, self.data, self.fonts, self.switch_stage)
-        #self.current_stage = Overworld(self.tmx_overworld, self.data, self.overworld_frames, self.switch_stage)
+        self.next_level: tuple[int, Level] | None = None
+        self.current_stage = LoadingScreen(self.create_level(CompiledMap(self.tmx_maps[0])), self.fonts, self.data, self.start_stage)
+        #self.current_stage = Overworld(CompiledMap(self.tmx_overworld), self.data, self.overworld_frames, self.switch_stage, self.prefetch_level)
         
         self.debugging = False
         
@@ -74,13 +77,33 @@ class Game:
     
     def switch_stage(self, target: str, unlock: int= 0) -> None:
         if target == 'level':
-            self.current_stage = Level(self.tmx_maps[self.data.current_level], self.level_frames, self.data, self.fonts, self.switch_stage)
+            # the level may already be partly built by prefetch_level
+            index = self.data.current_level
+            if self.next_level and self.next_level[0] == index:
+                level = self.next_level[1]
+            else:
+                level = self.create_level(CompiledMap(self.tmx_maps[index]))
+            self.next_level = None
+            self.current_stage = LoadingScreen(level, self.fonts, self.data, self.start_stage)
         elif target == 'settings':
             pass
         else:
             if unlock > 0:
                 self.data.unlocked_level = unlock
-            self.current_stage = Overworld(self.tmx_overworld, self.data, self.overworld_frames, self.switch_stage)
+            self.current_stage = Overworld(CompiledMap(self.tmx_overworld), self.data, self.overworld_frames, self.switch_stage, self.prefetch_level)
+    
+    def start_stage(self, stage) -> None:
+        self.current_stage = stage
+    
+    def prefetch_level(self, index: int) -> None:
+        '''Start building the level of the selected overworld node before it is confirmed, a little every frame'''
+        if index in self.tmx_maps and not (self.next_level and self.next_level[0] == index):
+            self.next_level = (index, self.create_level(CompiledMap(self.tmx_maps[index])))
+    
+    def create_level(self, tmx_map: CompiledMap) -> Level:
+        '''Load the frame sets the level uses, letting the ones it doesn't go, and build the level'''
+        self.level_frames.require(level_manifest(tmx_map))
+        return Level(tmx_map, self.level_frames, self.data, self.fonts, self.switch_stage)
     
     def save_game(self) -> None:
         '''Save self.data as a serialised object'''
@@ -100,42 +123,17 @@ class Game:
             pass
     
     def import_assets(self) -> None:
-        '''Import game assets'''
-        self.level_frames = {
-            'player': import_sub_folders('.', 'assets', 'graphic', 'player'),
-            'arrow': import_folder(join('.', 'assets', 'graphic', 'projectiles', 'arrow')),
-            'door': import_folder('.', 'assets', 'graphic', 'level', 'door'),
-            # INTERACTION
-            'interact': import_folder('.', 'assets', 'graphic', 'level', 'interaction'),
-            # NPC
-            'snail': import_folder('.', 'assets', 'graphic', 'npc', 'snail'),
-            'creature': import_sub_folders('.', 'assets', 'graphic', 'npc', 'creature'),
-            # VFX
-            'vfx': import_sub_folders('.', 'assets', 'graphic', 'vfx'),
-            # ENEMY
-            'plant': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'plant'),
-            'skeleton': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'walker', 'skeleton'),
-            'zombie': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'walker', 'zombie'),
-            'shadowman': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'chaser', 'shadowman'),
-            'horn': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'chaser', 'horn'),
-            'crawler': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'crawler'),
-            'ghost': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'ghost'),
-            # BOSS
-            'golem': import_sub_folders('.', 'assets', 'graphic', 'boss', 'golem'),
-            # TRAP
-            'spike': import_image('.', 'assets', 'graphic', 'level', 'spike'),
-            'boulder': import_image('.', 'assets', 'graphic', 'level', 'boulder'),
-            # MOVING PLATFORM
-            'elevator': import_folder('.', 'assets', 'graphic', 'level', 'elevator'),
-            # ITEM
-            'items': import_sub_folders('.', 'assets', 'graphic', 'items'),
-            'chest': import_folder('.', 'assets', 'graphic', 'level', 'chest')
-        }
-        self.overworld_frames = {
-            'path': import_folder_dict(join('.', 'assets', 'graphic', 'overworld', 'path')),
-            'icon': import_sub_folders(join('.', 'assets', 'graphic', 'overworld', 'icon')),
-            'water': import_folder(join('.', 'assets', 'graphic', 'overworld', 'water'))
-        }
+        '''Import game assets, the graphics come from the asset bundle which is only rebuilt from PNGs when it is out of date.
+        Level frame sets are decoded when a level needs them'''
+        self.bundle = AssetBundle(join('.', 'cache'), join('.', 'assets', 'graphic'), __file__)
+        graphics = self.bundle.load()
+        if graphics is None:
+            self.bundle.save(*self.import_graphics())
+            graphics = self.bundle.load()
+        self.atlas = self.bundle.atlas
+        self.level_frames = FrameSets(self.bundle, graphics['level'])
+        self.overworld_frames = self.bundle.decode(graphics['overworld'])
+        self.ui_frames = self.bundle.decode(graphics['ui'])
         self.bgm = {
             'overworld': pygame.mixer.Sound(join('.', 'assets', 'sound', 'bgm', 'overworld.wav'))
         }
@@ -144,9 +142,6 @@ class Game:
             'land': pygame.mixer.Sound(join('.', 'assets', 'sound', 'sfx', 'jump_land.wav')),
             'step': pygame.mixer.Sound(join('.', 'assets', 'sound', 'sfx', 'footstep.wav'))
         }
-        self.ui_frames = {
-            'heart': import_folder(join('.', 'assets', 'graphic', 'ui', 'heart'))
-        }
         self.fonts = {
             'regular': pygame.font.Font(join('.', 'assets', 'fonts', 'regular.ttf'), 16),
             'bold': pygame.font.Font(join('.', 'assets', 'fonts', 'bold.ttf'), 16),
@@ -154,6 +149,49 @@ class Game:
             'large_bold': pygame.font.Font(join('.', 'assets', 'fonts', '8_bold.ttf'), 32)
         }
     
+    def import_graphics(self) -> tuple[Atlas, dict]:
+        '''Import the graphics from PNGs, the frames are packed into the pages of one texture atlas'''
+        self.atlas = Atlas()
+        level_frames = {
+            'player': import_sub_folders('.', 'assets', 'graphic', 'player', atlas= self.atlas),
+            'arrow': import_folder(join('.', 'assets', 'graphic', 'projectiles', 'arrow'), atlas= self.atlas),
+            'door': import_folder('.', 'assets', 'graphic', 'level', 'door', atlas= self.atlas),
+            # INTERACTION
+            'interact': import_folder('.', 'assets', 'graphic', 'level', 'interaction', atlas= self.atlas),
+            # NPC
+            'snail': import_folder('.', 'assets', 'graphic', 'npc', 'snail', atlas= self.atlas),
+            'creature': import_sub_folders('.', 'assets', 'graphic', 'npc', 'creature', atlas= self.atlas),
+            # VFX
+            'vfx': import_sub_folders('.', 'assets', 'graphic', 'vfx', atlas= self.atlas),
+            # ENEMY
+            'plant': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'plant', atlas= self.atlas),
+            'skeleton': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'walker', 'skeleton', atlas= self.atlas),
+            'zombie': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'walker', 'zombie', atlas= self.atlas),
+            'shadowman': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'chaser', 'shadowman', atlas= self.atlas),
+            'horn': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'chaser', 'horn', atlas= self.atlas),
+            'crawler': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'crawler', atlas= self.atlas),
+            'ghost': import_sub_folders('.', 'assets', 'graphic', 'enemy', 'ghost', atlas= self.atlas),
+            # BOSS
+            'golem': import_sub_folders('.', 'assets', 'graphic', 'boss', 'golem', atlas= self.atlas),
+            # TRAP
+            'spike': Frames([import_image('.', 'assets', 'graphic', 'level', 'spike', atlas= self.atlas)], self.atlas),
+            'boulder': Frames([import_image('.', 'assets', 'graphic', 'level', 'boulder', atlas= self.atlas)], self.atlas),
+            # MOVING PLATFORM
+            'elevator': import_folder('.', 'assets', 'graphic', 'level', 'elevator', atlas= self.atlas),
+            # ITEM
+            'items': import_sub_folders('.', 'assets', 'graphic', 'items', atlas= self.atlas),
+            'chest': import_folder('.', 'assets', 'graphic', 'level', 'chest', atlas= self.atlas)
+        }
+        overworld_frames = {
+            'path': import_folder_dict(join('.', 'assets', 'graphic', 'overworld', 'path'), atlas= self.atlas),
+            'icon': import_sub_folders(join('.', 'assets', 'graphic', 'overworld', 'icon'), atlas= self.atlas),
+            'water': import_folder(join('.', 'assets', 'graphic', 'overworld', 'water'), atlas= self.atlas)
+        }
+        ui_frames = {
+            'heart': import_folder(join('.', 'assets', 'graphic', 'ui', 'heart'), atlas= self.atlas)
+        }
+        return self.atlas, {'level': level_frames, 'overworld': overworld_frames, 'ui': ui_frames}
+    
     def run(self) -> None:
         '''The game loop, runs current stage'''
         while True:
@@ -175,6 +213,9 @@ class Game:
                     '''Show or hide debug surfaces'''
                     if event.key == pygame.K_TAB:
                         self.debugging = not self.debugging
+                        # the debug surfaces are drawn over the letterboxing
+                        if not self.debugging:
+                            self.presenter.clear()
                     
                     if event.key == pygame.K_BACKSPACE:
                         self.filter += 1
@@ -183,12 +224,12 @@ class Game:
                         self.invert += 1
                         self.invert = 0 if self.invert > 1 else self.invert
             
-            self.display.fill('gray')
             self.current_stage.run(dt)
+            if self.next_level:
+                build_level(self.next_level[1], 0.002)
             
-            # change colours of every pixel on given surface(s)
-            change_colours((self.game_screen, ), self.filters[self.filter], self.invert)
-            self.display.blit(pygame.transform.scale(self.data.screen, (WINDOW_WIDTH, WINDOW_HEIGHT)))
+            # the colour filter is applied on the way to the window
+            self.presenter.present(self.filters[self.filter], self.invert)
             
             # DEBUG show fps & dt
             if self.debugging:
@@ -196,7 +237,7 @@ class Game:
                 debug_multiple((f'dt: {dt}',))
             
             # update display
-            pygame.display.update()
+            self.presenter.update(full= self.debugging)
 
 
 if __name__ == "__main__":
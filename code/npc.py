@@ -18,8 +18,8 @@ class Creature(pygame.sprite.Sprite):
     def animate(self, dt) -> None:
         self.frame_index += ANIMATION_SPEED * dt
                 
-        self.image = self.frames[self.state][int(self.frame_index) % len(self.frames[self.state])]
-        self.image = self.image if self.facing_right else pygame.transform.flip(self.image, True, False)
+        frames = self.frames[self.state].variant(flip_x= not self.facing_right)
+        self.image = frames[int(self.frame_index) % len(frames)]
     
     def update(self, dt) -> None:
         
@@ -28,7 +28,7 @@ class Creature(pygame.sprite.Sprite):
 
 class Snail(pygame.sprite.Sprite):
     '''Snail is a friendly NPC that moves left and right. The player can ride on it to avoid spike damage'''
-    def __init__(self, position, frames, groups, collision_sprites) -> None:
+    def __init__(self, position, frames, groups, collision_grid) -> None:
         super().__init__(groups)
         self.moving = True
         
@@ -44,7 +44,7 @@ class Snail(pygame.sprite.Sprite):
         dir = choice((-1, 1))
         self.direction = vector(dir, 0)
         
-        self.collision_rects = [sprite.rect for sprite in collision_sprites]
+        self.collision_grid = collision_grid
                 
         self.speed = 8
     
@@ -53,9 +53,9 @@ class Snail(pygame.sprite.Sprite):
         floor_rect_left = pygame.FRect(self.hitbox_rect.bottomleft + vector(-1, 0), (1, 1))
         wall_rect = pygame.FRect(self.hitbox_rect.topleft + vector(-1, 0), (self.hitbox_rect.width + 2, 2))
         
-        if floor_rect_right.collidelist(self.collision_rects) < 0 and self.direction.x > 0 or\
-            floor_rect_left.collidelist(self.collision_rects) < 0 and self.direction.x < 0 or\
-            wall_rect.collidelist(self.collision_rects) != -1:
+        if not self.collision_grid.collide(floor_rect_right) and self.direction.x > 0 or\
+            not self.collision_grid.collide(floor_rect_left) and self.direction.x < 0 or\
+            self.collision_grid.collide(wall_rect):
             self.direction.x *= -1
     
     def move(self, dt) -> None:
@@ -65,8 +65,7 @@ class Snail(pygame.sprite.Sprite):
     
     def animate(self, dt) -> None:
         self.frame_index += ANIMATION_SPEED * dt
-        self.image = self.frames[int(self.frame_index % len(self.frames))]
-        self.image = pygame.transform.flip(self.image, True, False) if self.direction.x < 0 else self.image
+        self.image = self.frames.variant(flip_x= self.direction.x < 0)[int(self.frame_index % len(self.frames))]
     
     def show_hitbox(self) -> None:
         '''Display a colourful hitbox for debug purposes'''
@@ -1,13 +1,14 @@
 from settings import *
+from animation import animation_clocks, tile_animation
 from camera import OverworldCamera
 from controls import MenuControls
-from sprites import AnimatedSprite, Sprite, Icon, Node, PathSprite
+from sprites import Sprite, Icon, Node, PathSprite
 
 class Overworld:
-    def __init__(self, tmx_map, data, overworld_frames, switch_stage) -> None:
-        self.display = pygame.display.get_surface()
+    def __init__(self, tmx_map, data, overworld_frames, switch_stage, prefetch_level) -> None:
         self.data = data
         self.switch_stage = switch_stage
+        self.prefetch_level = prefetch_level
         
         self.controls = MenuControls()
         
@@ -19,23 +20,32 @@ class Overworld:
         )
         self.node_sprites = pygame.sprite.Group()
         
-        self.setup(tmx_map, overworld_frames)
-        
-        self.current_node = [node for node in self.node_sprites if node.level == 0][0]
-        
-        self.path_frames = overworld_frames['path']
-        self.create_path_sprites()
+        with animation_clocks.using(self):
+            self.setup(tmx_map, overworld_frames)
+            
+            self.current_node = [node for node in self.node_sprites if node.level == 0][0]
+            
+            self.path_frames = overworld_frames['path']
+            self.create_path_sprites()
     
     def setup(self, tmx_map, overworld_frames) -> None:
         # tiles
+        tile_frames = {}
         for layer in ['main', 'top']:
-            for x, y, surface in tmx_map.get_layer_by_name(layer).tiles():
-                Sprite((x * TILE_SIZE, y * TILE_SIZE), surface, self.all_sprites, Z_LAYERS['bg_tiles'])
+            for x, y, gid in tmx_map.get_layer_by_name(layer):
+                if not gid:
+                    continue
+                clock = tile_animation(tmx_map, gid, tile_frames)
+                if clock:
+                    self.all_sprites.add_animated_tile((x * TILE_SIZE, y * TILE_SIZE), clock, Z_LAYERS['bg_tiles'])
+                else:
+                    Sprite((x * TILE_SIZE, y * TILE_SIZE), tmx_map.get_tile_image_by_gid(gid), self.all_sprites, Z_LAYERS['bg_tiles'])
         
-        # water
+        # water, every cell shows the frame of one shared clock
+        water = animation_clocks.get(overworld_frames['water'])
         for col in range(tmx_map.width):
             for row in range(tmx_map.height):
-                AnimatedSprite((col * TILE_SIZE, row * TILE_SIZE), overworld_frames['water'], self.all_sprites, Z_LAYERS['bg'])
+                self.all_sprites.add_animated_tile((col * TILE_SIZE, row * TILE_SIZE), water, Z_LAYERS['bg'])
         
         # objects
         for obj in tmx_map.get_layer_by_name('objects'):
@@ -148,10 +158,13 @@ class Overworld:
         nodes = pygame.sprite.spritecollide(self.icon, self.node_sprites, False)
         if nodes:
             self.current_node = nodes[0]
+            # start building the level the icon stopped on
+            if not self.icon.path:
+                self.prefetch_level(self.current_node.level)
     
     def run(self, dt) -> None:
-        self.display.fill('black')
         self.input()
         self.get_current_node()
+        animation_clocks.update(dt, self)
         self.all_sprites.update(dt)
         self.all_sprites.draw(self.icon.rect)
\ No newline at end of file
@@ -4,12 +4,15 @@ if TYPE_CHECKING:
     from gdata import GameData
 
 from settings import *
+from animation import animation_clocks
 from colours import ColourPalette, change_colours
 from controls import MenuControls
-from sprites import AnimatedSprite, Sprite
+from sprites import AnimatedSprite
+from text import text_cache, get_glyph_atlas
 
 class PauseScreen:
-    '''When the game is paused a screen is displayed with two buttons and info about current stage'''
+    '''When the game is paused a screen is displayed with two buttons and info about current stage.
+    Everything but the coin animation is kept on a background that is only drawn again when what it shows changes'''
     def __init__(self, frames: dict, fonts: dict, data: GameData) -> None:
         self.screen = data.screen
         
@@ -18,7 +21,8 @@ class PauseScreen:
         self.controls = MenuControls()
         
         self.sprites = pygame.sprite.Group()
-        self.coin = AnimatedSprite(((self.screen.get_width() / 3) * 2, self.screen.get_height() / 2), self.frames['coin'], self.sprites)
+        with animation_clocks.using(self):
+            self.coin = AnimatedSprite(((self.screen.get_width() / 3) * 2, self.screen.get_height() / 2), self.frames['coin'], self.sprites)
         
         self.fonts = fonts
         self.data = data
@@ -49,6 +53,11 @@ class PauseScreen:
         ]
         self.filter = 0
         self.invert = 0
+        
+        # retained background, plain and with the colour filter applied
+        self.background = pygame.Surface(self.screen.get_size())
+        self.filtered_background = pygame.Surface(self.screen.get_size())
+        self.background_state = None
     
     def input(self) -> None:
         '''Check keyboard input'''
@@ -77,34 +86,37 @@ class PauseScreen:
     
     def show_pause_text(self) -> None:
         '''Display paused label'''
-        text = self.fonts['large_bold'].render('PAUSED', False, 'white')
+        text = text_cache.render(self.fonts['large_bold'], 'PAUSED', False, 'white')
         rect = pygame.Rect(self.screen.get_width() / 2 - text.get_width() / 2,
                            16,
                            text.get_width(), text.get_height())
-        self.screen.blit(text, rect)
+        self.background.blit(text, rect)
     
     def show_coin_text(self) -> None:
         '''Display coins label'''
-        text = self.fonts['regular'].render('coins', False, 'white')
+        text = text_cache.render(self.fonts['regular'], 'coins', False, 'white')
         rect = pygame.Rect(int(self.coin.rect.x) - 2 * text.get_width(),
                            int(self.coin.rect.y) - 5,
                            text.get_width(), text.get_height())
-        coins = self.fonts['bold'].render(f'{self.data.coins}', False, 'white')
-        coin_rect = pygame.Rect(self.coin.rect.x - 1.5 * coins.get_width(),
+        # the count changes, so it is drawn from cached glyphs
+        glyphs = get_glyph_atlas(self.fonts['bold'])
+        coins = f'{self.data.coins}'
+        coins_width, coins_height = glyphs.size(coins)
+        coin_rect = pygame.Rect(self.coin.rect.x - 1.5 * coins_width,
                                 rect.top,
-                                coins.get_width(), coins.get_height())
-        self.screen.blit(text, rect)
-        self.screen.blit(coins, coin_rect)
+                                coins_width, coins_height)
+        self.background.blit(text, rect)
+        glyphs.draw(self.background, coins, 'white', coin_rect.topleft)
     
     def show_key(self) -> None:
         '''Display the key if in possession of it'''
         if self.data.key:
-            Sprite((self.screen.get_width() / 2, self.screen.get_height() / 2 + 16), self.frames['key'][0], self.sprites)
+            self.background.blit(self.frames['key'][0], (self.screen.get_width() / 2, self.screen.get_height() / 2 + 16))
     
     def show_buttons(self) -> None:
         '''Display resume and quit buttons and draw rectangle around selected one'''
-        resume = self.fonts['bold'].render('RESUME', False, 'white')
-        quit = self.fonts['bold'].render('QUIT', False, 'white')
+        resume = text_cache.render(self.fonts['bold'], 'RESUME', False, 'white')
+        quit = text_cache.render(self.fonts['bold'], 'QUIT', False, 'white')
         resume_rect = pygame.Rect(self.screen.get_width() / 2 - resume.get_width(),
                                   (self.screen.get_height() / 4) * 3,
                                   resume.get_width(), resume.get_height())
@@ -112,29 +124,39 @@ class PauseScreen:
                                 resume_rect.top,
                                 quit.get_width(), quit.get_height())
         
-        self.screen.blit(resume, resume_rect)
-        self.screen.blit(quit, quit_rect)
+        self.background.blit(resume, resume_rect)
+        self.background.blit(quit, quit_rect)
         
         buttons = [resume_rect.inflate(8, 8), quit_rect.inflate(8, 8)]
         
-        pygame.draw.rect(self.screen, 'white', buttons[self.selected], 1)
+        pygame.draw.rect(self.background, 'white', buttons[self.selected], 1)
     
-    def run(self, dt) -> None:
-        '''The run method'''
-        self.screen.fill('black')
-        
+    def draw_background(self) -> None:
+        '''Draw everything that doesn't move, only when the selection, coins, key or filter changed'''
+        state = (self.selected, self.data.coins, self.data.key, self.filter, self.invert)
+        if state == self.background_state:
+            return
+        self.background_state = state
+        
+        self.background.fill('black')
         self.show_pause_text()
-        
-        self.input()
-        
         self.show_coin_text()
         self.show_key()
         self.show_buttons()
         
+        self.filtered_background.blit(self.background, (0, 0))
+        change_colours((self.filtered_background, ), self.filters[self.filter], self.invert)
+    
+    def run(self, dt) -> None:
+        '''The run method'''
+        self.input()
+        self.draw_background()
+        self.screen.blit(self.filtered_background, (0, 0))
+        
+        # the coin is drawn over the plain background and only its area is filtered
+        animation_clocks.update(dt, self)
         self.sprites.update(dt)
+        coin_area = pygame.Rect(self.coin.rect).inflate(2, 2).clip(self.screen.get_rect())
+        self.screen.blit(self.background, coin_area, coin_area)
         self.sprites.draw(self.screen)
-        
-        change_colours((self.screen, ), self.filters[self.filter], self.invert)
-        #scaled = pygame.transform.scale(self.screen, (PAUSE_WIDTH, PAUSE_HEIGHT))
-        #self.display.blit(scaled, (171, 0))
-        
\ No newline at end of file
+        change_colours((self.screen.subsurface(coin_area), ), self.filters[self.filter], self.invert)
@@ -1,9 +1,10 @@
 from settings import *
+from collision import SOLID, ONE_WAY
 from controls import LevelControls
 from gtimer import Timer
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, position, groups, collision_sprites, semi_collision_sprites, snail_sprites, frames, data, projectile):
+    def __init__(self, position, groups, collision_grid, semi_collision_sprites, snail_sprites, frames, data, projectile):
         # general setup
         super().__init__(groups)
         self.z = Z_LAYERS['main']
@@ -21,12 +22,6 @@ class Player(pygame.sprite.Sprite):
         self.frames, self.frame_index = frames, 0
         self.state, self.facing_right = 'idle', True
         self.image = self.frames[self.state][self.frame_index]
-        self.mask = pygame.mask.from_surface(self.image)
-                
-        # minimap
-        self.map_image = pygame.Surface((1, 1))
-        self.map_image.fill('red')
-        self.map_rect = self.map_image.get_frect(topleft = (position[0] / TILE_SIZE, position[1] / TILE_SIZE))
         
         # rects
         self.rect = self.image.get_frect(topleft = position)
@@ -49,8 +44,8 @@ class Player(pygame.sprite.Sprite):
         self.create_projectile = projectile
         self.interaction = {'can': False, 'do': False}
         
-        # collision
-        self.collision_sprites = collision_sprites
+        # collision, terrain comes from the level's grid and only moving platforms are sprites
+        self.collision_grid = collision_grid
         self.semi_collision_sprites = semi_collision_sprites
         self.snail_sprites = snail_sprites
         self.on_surface = {'floor': False, 'left': False, 'right': False}
@@ -62,7 +57,9 @@ class Player(pygame.sprite.Sprite):
             'platform_skip': Timer(100),
             'walljump': Timer(150),
             'wallslide_block': Timer(400),
-            'attack_lock': Timer(450)
+            'attack_lock': Timer(450),
+            'hit': Timer(1000),
+            'knockback': Timer(200)
         }
         self.timers['spawn'].start()
     
@@ -73,8 +70,8 @@ class Player(pygame.sprite.Sprite):
         input_vector = vector(0, 0)
         
         if self.abilities['input']:
-            # we ignore input for a short time while jumping off the wall
-            if not self.timers['walljump'].active:
+            # we ignore input for a short time while jumping off the wall or knocked back
+            if not self.timers['walljump'].active and not self.timers['knockback'].active:
                 # movement
                 if pressed[self.controls.right] and not self.state in ('melee', 'ranged'):
                     input_vector.x += 1
@@ -144,6 +141,18 @@ class Player(pygame.sprite.Sprite):
                 self.frame_index = 0
                 self.timers['attack_lock'].start()
     
+    def take_hit(self, source: pygame.FRect) -> None:
+        '''Lose a point of health and get knocked away from the source, then stay invulnerable while the hit timer runs'''
+        if self.timers['hit'].active:
+            return
+        self.timers['hit'].start()
+        self.data.health = max(self.data.health - 1, 0)
+        
+        self.timers['knockback'].start()
+        self.direction.x = -1 if source.centerx > self.hitbox_rect.centerx else 1
+        self.direction.y = -self.jump_height / 2
+        self.hitbox_rect.bottom -= 1
+    
     def move(self, dt) -> None:
         if not self.timers['spawn'].active:
             # horizontal movement
@@ -189,7 +198,6 @@ class Player(pygame.sprite.Sprite):
             self.semi_collision()
             
             self.rect.topleft = self.hitbox_rect.topleft + vector(-13, -16)
-            self.map_rect.x, self.map_rect.y = self.hitbox_rect.x / TILE_SIZE, self.hitbox_rect.y / TILE_SIZE
     
     def platform_move(self, dt) -> None:
         if self.platform:
@@ -200,51 +208,61 @@ class Player(pygame.sprite.Sprite):
         right_rect = pygame.Rect((self.hitbox_rect.topright + vector(0, self.hitbox_rect.height / 4)), (2, self.rect.height / 2))    # rect on RIGHT side of player
         left_rect = pygame.Rect((self.hitbox_rect.topleft + vector(-2, self.hitbox_rect.height / 4)), (2, self.rect.height / 2))    # rect on LEFT side of player
         
-        collide_rects = [sprite.rect for sprite in self.collision_sprites]
         semi_collide_rects = [sprite.rect for sprite in self.semi_collision_sprites]
         snail_rects = [sprite.hitbox_rect for sprite in self.snail_sprites]
         
         # collisions
-        self.on_surface['floor'] = True if floor_rect.collidelist(collide_rects) >= 0 or\
+        self.on_surface['floor'] = True if self.collision_grid.collide(floor_rect, SOLID) or\
+                                        self.collision_grid.collide(floor_rect, ONE_WAY) or\
                                         floor_rect.collidelist(semi_collide_rects) >= 0 or\
                                         floor_rect.collidelist(snail_rects) >= 0 and\
                                         self.direction.y >= 0 else False
-        self.on_surface['right'] = True if right_rect.collidelist(collide_rects) >= 0 else False
-        self.on_surface['left'] = True if left_rect.collidelist(collide_rects) >= 0 else False
+        self.on_surface['right'] = self.collision_grid.collide(right_rect, SOLID)
+        self.on_surface['left'] = self.collision_grid.collide(left_rect, SOLID)
         
         self.platform = None
-        sprites = self.collision_sprites.sprites() + self.semi_collision_sprites.sprites() + self.snail_sprites.sprites()
+        sprites = self.semi_collision_sprites.sprites() + self.snail_sprites.sprites()
         for sprite in [sprite for sprite in sprites if hasattr(sprite, 'moving')]:
             if sprite.rect.colliderect(floor_rect):
                 self.platform = sprite
     
+    def obstacles(self, flags) -> list[tuple[pygame.FRect, pygame.FRect, bool]]:
+        '''Rect, old rect and whether it moves for everything near the hitbox with the collision flags.
+        The area is grown by a tile as resolving a collision can push the hitbox into a neighbouring tile.'''
+        # merged tiles never move, their old rect is their rect
+        area = self.hitbox_rect.inflate(TILE_SIZE * 2, TILE_SIZE * 2)
+        obstacles = [(rect, rect, False) for rect in self.collision_grid.rects(area, flags)]
+        if flags & ONE_WAY:
+            obstacles.extend((sprite.rect, sprite.old_rect, hasattr(sprite, 'moving')) for sprite in self.semi_collision_sprites)
+        return obstacles
+    
     def collision(self, axis) -> None:
-        for sprite in self.collision_sprites:
-            if sprite.rect.colliderect(self.hitbox_rect):
+        for rect, old_rect, moving in self.obstacles(SOLID):
+            if rect.colliderect(self.hitbox_rect):
                 if axis == 'horizontal':
                     # WESTBOUND
-                    if self.hitbox_rect.left <= sprite.rect.right and int(self.old_rect.left) >= int(sprite.old_rect.right):
-                        self.hitbox_rect.left = sprite.rect.right
+                    if self.hitbox_rect.left <= rect.right and int(self.old_rect.left) >= int(old_rect.right):
+                        self.hitbox_rect.left = rect.right
                     # EASTBOUND
-                    if self.hitbox_rect.right >= sprite.rect.left and int(self.old_rect.right) <= int(sprite.old_rect.left):
-                        self.hitbox_rect.right = sprite.rect.left
+                    if self.hitbox_rect.right >= rect.left and int(self.old_rect.right) <= int(old_rect.left):
+                        self.hitbox_rect.right = rect.left
                 if axis == 'vertical':
                     # NORTHBOUND
-                    if self.hitbox_rect.top <= sprite.rect.bottom and int(self.old_rect.top) >= int(sprite.old_rect.bottom):
-                        self.hitbox_rect.top = sprite.rect.bottom
-                        if hasattr(sprite, 'moving'):
+                    if self.hitbox_rect.top <= rect.bottom and int(self.old_rect.top) >= int(old_rect.bottom):
+                        self.hitbox_rect.top = rect.bottom
+                        if moving:
                             self.hitbox_rect.top += 1
                     # SOUTHBOUND
-                    if self.hitbox_rect.bottom >= sprite.rect.top and int(self.old_rect.bottom) <= int(sprite.old_rect.top):
-                        self.hitbox_rect.bottom = sprite.rect.top
+                    if self.hitbox_rect.bottom >= rect.top and int(self.old_rect.bottom) <= int(old_rect.top):
+                        self.hitbox_rect.bottom = rect.top
                     self.direction.y = 0
     
     def semi_collision(self) -> None:
         if not self.timers['platform_skip'].active:
-            for sprite in self.semi_collision_sprites:
-                if sprite.rect.colliderect(self.hitbox_rect):
-                    if self.hitbox_rect.bottom >= sprite.rect.top and int(self.old_rect.bottom) <= int(sprite.old_rect.top):
-                        self.hitbox_rect.bottom = sprite.rect.top
+            for rect, old_rect, _ in self.obstacles(ONE_WAY):
+                if rect.colliderect(self.hitbox_rect):
+                    if self.hitbox_rect.bottom >= rect.top and int(self.old_rect.bottom) <= int(old_rect.top):
+                        self.hitbox_rect.bottom = rect.top
                         if self.direction.y > 0:
                             self.direction.y = 0
             for sprite in self.snail_sprites:
@@ -274,9 +292,8 @@ class Player(pygame.sprite.Sprite):
             self.state = 'idle'
             self.has_fired = False
         
-        self.image = self.frames[self.state][int(self.frame_index) % len(self.frames[self.state])]
-        self.image = self.image if self.facing_right else pygame.transform.flip(self.image, True, False)
-        self.mask = pygame.mask.from_surface(self.image)
+        frames = self.frames[self.state].variant(flip_x= not self.facing_right)
+        self.image = frames[int(self.frame_index) % len(frames)]
         
         if self.melee_atk and self.frame_index > len(self.frames[self.state]):
             self.melee_atk = False
@@ -348,7 +365,6 @@ class Arrow(pygame.sprite.Sprite):
         super().__init__(groups)
         self.frames, self.frame_index = frames, 0
         self.image = self.frames[self.frame_index]
-        self.mask = pygame.mask.from_surface(self.image)
         
         self.rect = self.image.get_frect(center= position + vector(6 * direction, 0))
         self.hitbox_rect = self.rect.inflate(0, 10)
@@ -364,9 +380,7 @@ class Arrow(pygame.sprite.Sprite):
     
     def animate(self, dt) -> None:
         self.frame_index += (ANIMATION_SPEED * 1.5) * dt
-        self.image = self.frames[int(self.frame_index % len(self.frames))]
-        self.image = pygame.transform.flip(self.image, True, False) if self.direction < 0 else self.image
-        self.mask = pygame.mask.from_surface(self.image)
+        self.image = self.frames.variant(flip_x= self.direction < 0)[int(self.frame_index % len(self.frames))]
     
     def update(self, dt) -> None:
         for timer in self.timers.values():
@@ -0,0 +1,63 @@
+from settings import *
+from colours import change_colours, indexed_palette
+
+class Presenter:
+    '''Scales the stage screen into the window, the one place any stage gets scaled.
+    With integer scaling every game pixel is the same size on the window, the space left is black letterboxing.'''
+    def __init__(self, display: pygame.Surface, screen: pygame.Surface, integer_scale: bool = INTEGER_SCALE, indexed: bool = INDEXED_RENDER) -> None:
+        self.display = display
+        self.screen = screen
+
+        scale = min(display.get_width() / screen.get_width(), display.get_height() / screen.get_height())
+        if integer_scale and scale >= 1:
+            scale = int(scale)
+        size = (round(screen.get_width() * scale), round(screen.get_height() * scale))
+        self.rect = pygame.Rect((0, 0), size)
+        self.rect.center = display.get_rect().center
+
+        # the scaled screen is written straight into the window, no surface is allocated per frame
+        self.target = display.subsurface(self.rect)
+        self.refresh = True
+
+        # indexed mode, the finished screen is written into 8-bit pixels shared by two surfaces.
+        # One keeps the plain colours to match the screen against, the other shows them with the filter palette.
+        # Stages still draw in true colour, blending alpha onto an 8-bit surface is far slower.
+        self.indexed = indexed
+        if indexed:
+            pixels = np.zeros(screen.get_width() * screen.get_height(), dtype= np.uint8)
+            self.indexed_screen = pygame.image.frombuffer(pixels, screen.get_size(), 'P')
+            self.indexed_screen.set_palette(indexed_palette())
+            self.filtered_screen = pygame.image.frombuffer(pixels, screen.get_size(), 'P')
+            self.frame = pygame.Surface(screen.get_size()).convert(display)
+            self.filter = None
+            self.set_filter(None)
+
+    def set_filter(self, palette, invert= False) -> None:
+        '''Give the filtered surface the palette colours, only when the filter changed'''
+        if self.filter != (palette, invert):
+            self.filter = (palette, invert)
+            self.filtered_screen.set_palette(indexed_palette(palette, invert))
+
+    def present(self, palette= None, invert= False) -> None:
+        '''Apply the colour filter and scale the screen into the letterboxed area of the window'''
+        if self.indexed:
+            self.set_filter(palette, invert)
+            self.indexed_screen.blit(self.screen, (0, 0))
+            self.frame.blit(self.filtered_screen, (0, 0))
+            pygame.transform.scale(self.frame, self.rect.size, self.target)
+        else:
+            change_colours((self.screen, ), palette, invert)
+            pygame.transform.scale(self.screen, self.rect.size, self.target)
+
+    def update(self, full: bool = False) -> None:
+        '''Update only the letterboxed area, or the whole window when the letterboxing has to be drawn again'''
+        if full or self.refresh:
+            self.refresh = False
+            pygame.display.update()
+        else:
+            pygame.display.update(self.rect)
+
+    def clear(self) -> None:
+        '''Blank the letterboxing, drawn on the window with the next full update'''
+        self.display.fill('black')
+        self.refresh = True
@@ -9,6 +9,9 @@ from random import choice, randint
 # Game Settings
 WINDOW_WIDTH, WINDOW_HEIGHT = 1366, 768     # the game window
 SCREEN_WIDTH, SCREEN_HEIGHT = 256, 144      # resolution
+INTEGER_SCALE = True                        # scale the resolution by whole numbers only and letterbox the rest of the window
+INDEXED_RENDER = False                      # present through an 8-bit surface, colour filters become palette swaps
+DAMAGE_MASKS = True                         # test damage with the sprite masks once the player's hitbox overlaps a sprite
 TILE_SIZE = 16                              # tile size in tmx_map
 ANIMATION_SPEED = 5                         # global animation speed
 
@@ -0,0 +1,124 @@
+from settings import *
+
+class SpatialHash:
+    '''A uniform grid that buckets sprites by the cells their rect overlaps, used to find sprites inside an area'''
+    def __init__(self, cell_size: int = TILE_SIZE * 4) -> None:
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], dict] = {}
+        self.sprite_cells: dict[pygame.sprite.Sprite, tuple[int, int, int, int]] = {}
+        
+        # the order sprites were added in, queries return them in it whatever cells they are in
+        self.sequence: dict[pygame.sprite.Sprite, int] = {}
+        self.next_sequence = 0
+
+    def cell_range(self, rect: pygame.FRect) -> tuple[int, int, int, int]:
+        '''Return the first and last cell column and row covered by a rect'''
+        size = self.cell_size
+        return (int(rect.left // size), int(rect.top // size),
+                int((rect.right - 1) // size), int((rect.bottom - 1) // size))
+
+    def insert(self, sprite: pygame.sprite.Sprite, cell_range: tuple[int, int, int, int]) -> None:
+        left, top, right, bottom = cell_range
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                self.cells.setdefault((x, y), {})[sprite] = None
+        self.sprite_cells[sprite] = cell_range
+
+    def add(self, sprite: pygame.sprite.Sprite) -> None:
+        '''Add a sprite to every cell its rect overlaps'''
+        if sprite in self.sprite_cells:
+            self.move(sprite)
+        else:
+            self.sequence[sprite] = self.next_sequence
+            self.next_sequence += 1
+            self.insert(sprite, self.cell_range(sprite.rect))
+
+    def remove(self, sprite: pygame.sprite.Sprite) -> None:
+        '''Remove a sprite from all of its cells'''
+        self.sequence.pop(sprite, None)
+        self.unlink(sprite)
+
+    def unlink(self, sprite: pygame.sprite.Sprite) -> None:
+        cell_range = self.sprite_cells.pop(sprite, None)
+        if cell_range:
+            left, top, right, bottom = cell_range
+            for x in range(left, right + 1):
+                for y in range(top, bottom + 1):
+                    cell = self.cells[(x, y)]
+                    del cell[sprite]
+                    if not cell:
+                        del self.cells[(x, y)]
+
+    def move(self, sprite: pygame.sprite.Sprite) -> None:
+        '''Re-bucket a sprite, only touches the grid when it crossed into other cells'''
+        cell_range = self.cell_range(sprite.rect)
+        if self.sprite_cells.get(sprite) != cell_range:
+            self.unlink(sprite)
+            self.insert(sprite, cell_range)
+
+    def query(self, rect: pygame.FRect) -> list[pygame.sprite.Sprite]:
+        '''Return the sprites in the cells overlapping a rect without duplicates, in the order they were added'''
+        found = {}
+        left, top, right, bottom = self.cell_range(rect)
+        cells = self.cells
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                cell = cells.get((x, y))
+                if cell:
+                    found.update(cell)
+        return sorted(found, key= self.sequence.__getitem__)
+
+    def __contains__(self, sprite: pygame.sprite.Sprite) -> bool:
+        return sprite in self.sprite_cells
+
+    def __len__(self) -> int:
+        return len(self.sprite_cells)
+
+class Broadphase:
+    '''A uniform grid of the sprites that move around a level stage, kept per named group and filled again every frame.
+    Sprites are bucketed by their rect and hitbox together, so either can be tested against the candidates found.'''
+    def __init__(self, groups: dict[str, pygame.sprite.AbstractGroup], cell_size: int = TILE_SIZE * 4) -> None:
+        self.groups = groups
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], dict[str, dict]] = {}
+
+    def cell_range(self, rect: pygame.FRect) -> tuple[int, int, int, int]:
+        '''Return the first and last cell column and row a rect can touch'''
+        size = self.cell_size
+        return int(rect.left // size), int(rect.top // size), int(rect.right // size), int(rect.bottom // size)
+
+    def bounds(self, sprite: pygame.sprite.Sprite) -> pygame.FRect:
+        hitbox = getattr(sprite, 'hitbox_rect', None)
+        return sprite.rect.union(hitbox) if hitbox else sprite.rect
+
+    def update(self) -> None:
+        '''Bucket every sprite of the groups by where it is now'''
+        self.cells = cells = {}
+        for name, group in self.groups.items():
+            for sprite in group:
+                left, top, right, bottom = self.cell_range(self.bounds(sprite))
+                for x in range(left, right + 1):
+                    for y in range(top, bottom + 1):
+                        cells.setdefault((x, y), {}).setdefault(name, {})[sprite] = None
+
+    def query(self, name: str, rect: pygame.FRect) -> dict:
+        '''Return the sprites of a group in the cells a rect touches, as an insertion ordered dict without duplicates'''
+        found = {}
+        left, top, right, bottom = self.cell_range(rect)
+        cells = self.cells
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                cell = cells.get((x, y))
+                if cell and name in cell:
+                    found.update(cell[name])
+        return found
+
+    def pairs(self, first: str, second: str) -> dict[tuple[pygame.sprite.Sprite, pygame.sprite.Sprite], None]:
+        '''Every pair of sprites of two groups sharing a cell, only the occupied cells are visited'''
+        found = {}
+        for cell in self.cells.values():
+            if first in cell and second in cell:
+                for sprite in cell[first]:
+                    for other in cell[second]:
+                        found[(sprite, other)] = None
+        return found
@@ -1,4 +1,5 @@
 from settings import *
+from animation import animation_clocks
 from gtimer import Timer
 
 # BLUEPRINTS
@@ -14,16 +15,15 @@ class Sprite(pygame.sprite.Sprite):
         self.z = z
 
 class AnimatedSprite(Sprite):
-    '''A static but animated sprite'''
+    '''A static but animated sprite, its frame comes from the clock shared by all sprites with the same frames and speed'''
     def __init__(self, position, frames, groups, z= Z_LAYERS['main'], animation_speed = ANIMATION_SPEED) -> None:
-        self.frames, self.frame_index = frames, 0
-        super().__init__(position, self.frames[self.frame_index], groups, z)
-        self.animation_speed = animation_speed
+        self.frames = frames
+        self.clock = animation_clocks.get(frames, animation_speed)
+        super().__init__(position, self.clock.image, groups, z)
     
     def animate(self, dt) -> None:
-        '''Animate through sprite frames'''
-        self.frame_index += self.animation_speed * dt
-        self.image = self.frames[int(self.frame_index % len(self.frames))]
+        '''Show the current frame of the shared clock'''
+        self.image = self.clock.image
     
     def update(self, dt) -> None:
         '''The update method'''
@@ -76,17 +76,16 @@ class MovingSprite(AnimatedSprite):
         
         self.animate(dt)
         if self.flip:
-            self.image = pygame.transform.flip(self.image, self.reverse['x'], self.reverse['y'])
+            self.image = self.frames.variant(self.reverse['x'], self.reverse['y'])[self.clock.index]
 
 # LEVEL
 class Item(AnimatedSprite):
     '''An item that can be picked up by player'''
     def __init__(self, item_type, position, frames, groups, data):
         self.data = data
-        super().__init__(position, frames, groups)
+        super().__init__(position, frames, groups, animation_speed= ANIMATION_SPEED * 1.5)
         self.rect.center = position
         self.item_type = item_type
-        self.animation_speed = ANIMATION_SPEED * 1.5
     
     def activate(self) -> None:
         if self.item_type == 'coin':
@@ -95,12 +94,12 @@ class Item(AnimatedSprite):
             self.data.key = True
         self.kill()
 
-class VFX(AnimatedSprite):
-    '''A visual effect used for projectile collisions'''
+class VFX(Sprite):
+    '''A visual effect used for projectile collisions, plays once from its own first frame'''
     def __init__(self, position, frames, groups) -> None:
-        super().__init__(position, frames, groups)
+        self.frames, self.frame_index = frames, 0
+        super().__init__(position, self.frames[self.frame_index], groups, Z_LAYERS['fg'])
         self.rect.center = position
-        self.z = Z_LAYERS['fg']
         self.animation_speed = 16
     
     def animate(self, dt) -> None:
@@ -109,6 +108,9 @@ class VFX(AnimatedSprite):
             self.image = self.frames[int(self.frame_index)]
         else:
             self.kill()
+    
+    def update(self, dt) -> None:
+        self.animate(dt)
 
 class ExprBubble(Sprite):
     marks = {
@@ -129,43 +131,16 @@ class ExprBubble(Sprite):
             self.kill()
 
 # UI
-class Heart(AnimatedSprite):
-    '''A heart for the ui'''
-    def __init__(self, position, frames, groups) -> None:
-        super().__init__(position, frames, groups)
-        self.z = Z_LAYERS['main']
-    
-    def update(self, dt) -> None:
-        self.animate(dt)
-
-# TERRAIN
-class Floor(Sprite):
-    '''Regular static terrain, the minimap visibility can be toggled as an argument'''
-    def __init__(self, position, surface, groups, hidden=False) -> None:
-        super().__init__(position, surface, groups)
-        
-        if not hidden:
-            # minimap
-            self.map_image = pygame.Surface((1, 1))
-            self.map_image.fill('white')
-            self.map_rect = self.map_image.get_frect(topleft = (position[0] / TILE_SIZE, position[1] / TILE_SIZE))
-
-class Platform(Floor):
-    '''Regular static platform'''
-    def __init__(self, position, surface, groups) -> None:
-        super().__init__(position, surface, groups)
-        self.map_image.fill('gray')
-
 # INTERACTIBLES
 class Door(Sprite):
     def __init__(self, position, frames, groups) -> None:
         super().__init__(position, frames[0], groups, Z_LAYERS['bg_tiles'])
-        self.frames, self.frame_index = frames, 0
+        self.frames = frames
+        self.clock = animation_clocks.get(frames)
         self.unlocked = False
     
     def animate(self, dt) -> None:
-        self.frame_index += ANIMATION_SPEED * dt
-        self.image = self.frames[int(self.frame_index % len(self.frames))]
+        self.image = self.clock.image
     
     def update(self, dt) -> None:
         if self.unlocked:
@@ -1,41 +1,157 @@
 from settings import *
+from concurrent.futures import ThreadPoolExecutor
 from os import walk
 from os.path import join
+from weakref import WeakKeyDictionary
 
-def import_image(*path, alpha=True, format='png') -> pygame.Surface:
+# image decoding releases the GIL, so PNGs are read and decoded on these threads
+decoder = ThreadPoolExecutor(thread_name_prefix= 'decoder')
+
+# collision masks shared by every sprite or tile that shows the same surface
+masks: WeakKeyDictionary[pygame.Surface, pygame.Mask] = WeakKeyDictionary()
+
+def get_mask(surface: pygame.Surface) -> pygame.Mask:
+    '''Returns the collision mask of a surface, it is only built the first time the surface is asked for.'''
+    mask = masks.get(surface)
+    if mask is None:
+        mask = masks[surface] = pygame.mask.from_surface(surface)
+    return mask
+
+def collide_mask(left: pygame.sprite.Sprite, right: pygame.sprite.Sprite) -> bool:
+    '''Pixel perfect collision test for spritecollide, the masks are only compared after the rects overlap.'''
+    if not left.rect.colliderect(right.rect):
+        return False
+    offset = (int(right.rect.x) - int(left.rect.x), int(right.rect.y) - int(left.rect.y))
+    return get_mask(left.image).overlap(get_mask(right.image), offset) is not None
+
+class Atlas:
+    '''Packs surfaces into a few large pages and hands out subsurface views of them in place of the originals'''
+    def __init__(self, page_size: int = 1024, padding: int = 1) -> None:
+        self.page_size = page_size
+        self.padding = padding
+        self.pages: list[pygame.Surface] = []
+        
+        # shelf packing, frames are placed left to right on rows as tall as their tallest frame.
+        # The shelves stay on their own page when an oversized frame is given a page after it.
+        self.shelf = pygame.Rect(0, 0, 0, 0)
+        self.page: pygame.Surface | None = None
+    
+    def new_page(self, size: tuple[int, int]) -> pygame.Surface:
+        page = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        page.fill((0, 0, 0, 0))
+        self.pages.append(page)
+        return page
+    
+    def place(self, width: int, height: int) -> tuple[pygame.Surface, tuple[int, int]]:
+        '''Find room for a rect of the given size, starting a new shelf or page when the current one is full'''
+        width, height = width + self.padding, height + self.padding
+        if width > self.page_size or height > self.page_size:
+            # too big to share a page
+            return self.new_page((width, height)), (0, 0)
+        if not self.page or self.shelf.right + width > self.page_size:
+            self.shelf = pygame.Rect(0, self.shelf.bottom, 0, 0)
+        if not self.page or self.shelf.top + height > self.page_size:
+            self.page = self.new_page((self.page_size, self.page_size))
+            self.shelf = pygame.Rect(0, 0, 0, 0)
+        position = self.shelf.topright
+        self.shelf.width += width
+        self.shelf.height = max(self.shelf.height, height)
+        return self.page, position
+    
+    def pack(self, surfaces: list[pygame.Surface]) -> list[pygame.Surface]:
+        '''Copy surfaces into the atlas and return subsurfaces of it in the same order'''
+        packed = [None] * len(surfaces)
+        # tallest first keeps the shelves tight
+        for index in sorted(range(len(surfaces)), key= lambda index: -surfaces[index].height):
+            surface = surfaces[index]
+            page, position = self.place(*surface.size)
+            # pages start transparent, adding copies the pixels exactly instead of alpha blending them
+            page.blit(surface, position, special_flags= pygame.BLEND_RGBA_ADD)
+            packed[index] = page.subsurface((position, surface.size))
+        return packed
+
+class Frames(list):
+    '''A list of animation frames that also holds their flipped and 90° rotated variants, made once on import'''
+    def __init__(self, surfaces= (), atlas: Atlas | None = None, variants: dict | None = None) -> None:
+        super().__init__(surfaces)
+        if variants is not None:
+            # made ahead of time, as when the frames come from an asset bundle
+            self.variants = {**variants, (False, 0): self}
+            return
+        
+        # every orientation is a horizontal flip or not, followed by a counterclockwise rotation
+        self.variants: dict[tuple[bool, int], list] = {(False, 0): self}
+        for flip_x in (False, True):
+            flipped = [pygame.transform.flip(surface, True, False) for surface in self] if flip_x else self
+            for angle in (0, 90, 180, 270):
+                if flip_x or angle:
+                    self.variants[(flip_x, angle)] = [pygame.transform.rotate(surface, angle) for surface in flipped] if angle else flipped
+        if atlas:
+            for key, variant in self.variants.items():
+                if key != (False, 0):
+                    self.variants[key] = atlas.pack(variant)
+        
+        # masks for every frame in every orientation are built here instead of during collisions
+        for variant in self.variants.values():
+            for surface in variant:
+                get_mask(surface)
+    
+    def variant(self, flip_x= False, flip_y= False, angle= 0) -> list:
+        '''Return the frames flipped as pygame.transform.flip and then rotated as pygame.transform.rotate would'''
+        if flip_y:
+            # a vertical flip is a horizontal flip turned upside down
+            flip_x, angle = not flip_x, angle + 180
+        return self.variants[(flip_x, angle % 360)]
+
+def load_images(paths: list[str], alpha= True) -> list[pygame.Surface]:
+    '''Decodes images on the thread pool and converts them to the display format on the main thread, in the order of the paths.'''
+    return [surface.convert_alpha() if alpha else surface.convert() for surface in decoder.map(pygame.image.load, paths)]
+
+def import_image(*path, alpha=True, format='png', atlas: Atlas | None = None) -> pygame.Surface:
     '''Imports a single image from the specified file path and returns it as a Pygame Surface object.'''
-    full_path = join(*path) + f'.{format}'
-    return pygame.image.load(full_path).convert_alpha() if alpha else pygame.image.load(full_path).convert()
+    surface = load_images([join(*path) + f'.{format}'], alpha)[0]
+    return atlas.pack([surface])[0] if atlas else surface
 
-def import_folder(*path) -> list:
-    '''Imports all images from a specified folder and returns them as a list of Pygame Surface objects.'''
-    frames = []
+def folder_images(*path) -> list[str]:
+    '''Returns the paths of the numbered frames in a folder, sorted by file name.'''
+    paths = []
     for folder_path, _, image_names in walk(join(*path)):
         for image_name in sorted(image_names):
             try:
                 int(image_name.split('.')[0])
-                full_path = join(folder_path, image_name)
-                frames.append(pygame.image.load(full_path).convert_alpha())
+                paths.append(join(folder_path, image_name))
             except ValueError:
                 # Skip files that cannot be converted to an integer
                 continue
-    return frames
+    return paths
 
-def import_folder_dict(*path):
-    frame_dict = {}
+def import_folder(*path, atlas: Atlas | None = None) -> Frames:
+    '''Imports all images from a specified folder and returns them as a list of Pygame Surface objects with their variants.
+    With an atlas the frames are subsurfaces of its pages.'''
+    frames = load_images(folder_images(*path))
+    return Frames(atlas.pack(frames) if atlas else frames, atlas)
+
+def import_folder_dict(*path, atlas: Atlas | None = None):
+    paths = {}
     for folder_path, _, image_names in walk(join(*path)):
         for image_name in image_names:
-            full_path = join(folder_path, image_name)
-            surface = pygame.image.load(full_path).convert_alpha()
-            frame_dict[image_name.split('.')[0]] = surface
+            paths[image_name.split('.')[0]] = join(folder_path, image_name)
+    frame_dict = dict(zip(paths, load_images(list(paths.values()))))
+    if atlas:
+        frame_dict = dict(zip(frame_dict, atlas.pack(list(frame_dict.values()))))
     return frame_dict
 
-def import_sub_folders(*path) -> dict:
+def import_sub_folders(*path, atlas: Atlas | None = None) -> dict:
     '''Imports assets from all subfolders within a specified folder and returns them as a dictionary.
     The keys are the subfolder names, and the values are lists of Pygame Surface objects representing the images within each subfolder.'''
-    frame_dict = {}
+    folders = {}
     for _, sub_folders, __ in walk(join(*path)):
-        if sub_folders:
-            for sub_folder in sub_folders:
-                frame_dict[sub_folder] = import_folder(*path, sub_folder)
+        for sub_folder in sub_folders:
+            folders[sub_folder] = folder_images(*path, sub_folder)
+    # every subfolder is decoded in one go so their files load in parallel
+    surfaces = iter(load_images([image_path for paths in folders.values() for image_path in paths]))
+    frame_dict = {}
+    for sub_folder, paths in folders.items():
+        frames = [next(surfaces) for _ in paths]
+        frame_dict[sub_folder] = Frames(atlas.pack(frames) if atlas else frames, atlas)
     return frame_dict
@@ -0,0 +1,70 @@
+from settings import *
+from collections import OrderedDict
+
+class TextCache:
+    '''Rendered text surfaces keyed by font, string, antialiasing and colour, the least recently used are dropped past capacity'''
+    def __init__(self, capacity: int = 256) -> None:
+        self.capacity = capacity
+        self.surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+
+    def render(self, font: pygame.font.Font, text: str, antialias: bool, colour) -> pygame.Surface:
+        '''Same as font.render, only renders a string the first time it is asked for'''
+        key = (font, text, antialias, colour)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = font.render(text, antialias, colour)
+            if len(self.surfaces) > self.capacity:
+                self.surfaces.popitem(last= False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+text_cache = TextCache()
+
+class GlyphAtlas:
+    '''The printable ASCII glyphs of a pixel font rendered side by side once per colour.
+    Strings are drawn a glyph at a time from it, for text like counters that changes too often to cache whole.'''
+    characters = ''.join(chr(code) for code in range(32, 127))
+
+    def __init__(self, font: pygame.font.Font) -> None:
+        self.font = font
+        self.strips: dict = {}
+        # pixel fonts aren't kerned, each glyph sits at the sum of the advances before it
+        self.areas: dict[str, pygame.Rect] = {}
+        x = 0
+        height = font.render(self.characters, False, 'white').get_height()
+        for character, metrics in zip(self.characters, font.metrics(self.characters)):
+            advance = metrics[4]
+            self.areas[character] = pygame.Rect(x, 0, advance, height)
+            x += advance
+        self.height = height
+
+    def size(self, text: str) -> tuple[int, int]:
+        '''Same as font.size'''
+        if not all(character in self.areas for character in text):
+            return text_cache.render(self.font, text, False, 'white').get_size()
+        return sum(self.areas[character].width for character in text), self.height
+
+    def draw(self, surface: pygame.Surface, text: str, colour, position: tuple[int, int]) -> pygame.Rect:
+        '''Blit a string onto a surface, looks the same as blitting font.render(text, False, colour)'''
+        if not all(character in self.areas for character in text):
+            return surface.blit(text_cache.render(self.font, text, False, colour), position)
+        strip = self.strips.get(colour)
+        if strip is None:
+            strip = self.strips[colour] = self.font.render(self.characters, False, colour)
+        x, y = int(position[0]), int(position[1])
+        blits = []
+        for character in text:
+            area = self.areas[character]
+            blits.append((strip, (x, y), area))
+            x += area.width
+        surface.blits(blits, doreturn= False)
+        return pygame.Rect(int(position[0]), y, x - int(position[0]), self.height)
+
+glyph_atlases: dict[pygame.font.Font, GlyphAtlas] = {}
+
+def get_glyph_atlas(font: pygame.font.Font) -> GlyphAtlas:
+    '''Return the glyph atlas of a font, made the first time it is used'''
+    if font not in glyph_atlases:
+        glyph_atlases[font] = GlyphAtlas(font)
+    return glyph_atlases[font]
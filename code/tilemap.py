@@ -0,0 +1,263 @@
+from settings import *
+from bundle import AssetBundle
+from support import Atlas
+from collections import namedtuple
+from os import makedirs, replace, stat
+from os.path import basename, dirname, normpath, splitext
+from xml.etree import ElementTree
+
+AnimationFrame = namedtuple('AnimationFrame', ['gid', 'duration'])
+
+# compiled files are a pickled header followed by binary data that is memory-mapped on load.
+# A file is compiled again whenever one of its sources changed size or modification time.
+COMPILED_VERSION = 2
+
+def align(offset: int) -> int:
+    return (offset + 15) // 16 * 16
+
+def stamp(sources: list[str]) -> list[tuple[str, int, int]]:
+    return [(source, stat(source).st_size, stat(source).st_mtime_ns) for source in sources]
+
+class CompiledData:
+    '''The binary data written after the header of a compiled file, filled while compiling'''
+    def __init__(self, pixel_format: str) -> None:
+        self.pixel_format = pixel_format
+        self.buffers: list[bytes] = []
+        self.size = 0
+
+    def add(self, buffer: bytes) -> int:
+        '''Queue a buffer to be written after the header and return its offset in the data'''
+        offset = self.size
+        self.buffers.append(buffer + bytes(align(len(buffer)) - len(buffer)))
+        self.size += align(len(buffer))
+        return offset
+
+    def add_page(self, page: pygame.Surface) -> tuple[int, tuple[int, int]]:
+        return self.add(pygame.image.tobytes(page, self.pixel_format)), page.size
+
+def read_header(cache_file: str, pixel_format: str) -> dict | None:
+    '''Return the header of a compiled file, or None when there is none or a source changed since it was compiled'''
+    try:
+        with open(cache_file, 'rb') as file:
+            size = int.from_bytes(file.read(8), 'little')
+            header = pickle.loads(file.read(size))
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    if header['version'] != COMPILED_VERSION or header['pixel_format'] != pixel_format:
+        return None
+    try:
+        if stamp([source for source, _, _ in header['sources']]) != header['sources']:
+            return None
+    except FileNotFoundError:
+        return None
+    header['data_offset'] = align(8 + size)
+    # a write cut short leaves a valid header in front of missing data
+    if stat(cache_file).st_size < header['data_offset'] + header['data_size']:
+        return None
+    return header
+
+def write_compiled(cache_file: str, header: dict, data: CompiledData, sources: list[str]) -> None:
+    header = pickle.dumps({**header, 'version': COMPILED_VERSION, 'pixel_format': data.pixel_format, 'sources': stamp(sources), 'data_size': data.size})
+    # written beside the old file and swapped in whole, like the asset bundle's index
+    with open(cache_file + '.tmp', 'wb') as file:
+        file.write(len(header).to_bytes(8, 'little'))
+        file.write(header)
+        file.write(bytes(align(8 + len(header)) - 8 - len(header)))
+        for buffer in data.buffers:
+            file.write(buffer)
+    replace(cache_file + '.tmp', cache_file)
+
+def load_compiled(path: str, cache_path: str, extension: str, sources: callable, compile: callable) -> tuple[dict, np.memmap]:
+    '''Return the header and the memory-mapped data of the compiled file of a source, compiling it first when it is missing or stale.
+    sources() lists the files it depends on, compile(data) adds the binary data and returns the header.'''
+    makedirs(cache_path, exist_ok= True)
+    folder, name = basename(dirname(path)), splitext(basename(path))[0]
+    cache_file = join(cache_path, f'{folder}_{name}.{extension}')
+    pixel_format = AssetBundle.get_pixel_format()
+
+    header = read_header(cache_file, pixel_format)
+    if header is None:
+        data = CompiledData(pixel_format)
+        write_compiled(cache_file, compile(data), data, sources())
+        header = read_header(cache_file, pixel_format)
+    # copy on write, like the asset bundle
+    return header, np.memmap(cache_file, dtype= np.uint8, mode= 'c', offset= header['data_offset'])
+
+def get_page(buffer: np.memmap, offset: int, size: tuple[int, int]) -> pygame.Surface:
+    width, height = size
+    pixel_format = AssetBundle.get_pixel_format()
+    page = pygame.image.frombuffer(buffer[offset:offset + width * height * 4], size, pixel_format)
+    return page if pixel_format == 'BGRA' else page.convert_alpha()
+
+class Tileset:
+    '''The tile images of a TSX file as subsurfaces of its image, or of a few atlas pages for image collections'''
+    def __init__(self, path: str, cache_path: str = join('.', 'cache', 'tilesets')) -> None:
+        self.path = path
+        self.transformed: dict[tuple[int, tuple[bool, bool, bool]], pygame.Surface] = {}
+        header, self.buffer = load_compiled(path, cache_path, 'tileset', self.sources, self.compile)
+        pages = [get_page(self.buffer, offset, size) for offset, size in header['pages']]
+        self.tiles = {tile_id: pages[page].subsurface(rect) for tile_id, (page, *rect) in header['tiles'].items()}
+
+    def sources(self) -> list[str]:
+        root = ElementTree.parse(self.path).getroot()
+        return [self.path] + [normpath(join(dirname(self.path), image.attrib['source'])) for image in root.iter('image')]
+
+    def compile(self, data: CompiledData) -> dict:
+        root = ElementTree.parse(self.path).getroot()
+        tiles = {}
+        image = root.find('image')
+        if image is not None:
+            # a single image cut into a grid of tiles
+            page = pygame.image.load(join(dirname(self.path), image.attrib['source'])).convert_alpha()
+            pages = [data.add_page(page)]
+            width, height = int(root.attrib['tilewidth']), int(root.attrib['tileheight'])
+            margin, spacing = int(root.attrib.get('margin', 0)), int(root.attrib.get('spacing', 0))
+            columns = int(root.attrib['columns'])
+            for tile_id in range(int(root.attrib['tilecount'])):
+                x = margin + tile_id % columns * (width + spacing)
+                y = margin + tile_id // columns * (height + spacing)
+                tiles[tile_id] = (0, x, y, width, height)
+        else:
+            # a collection of images, one per tile
+            atlas = Atlas(page_size= 256)
+            tile_ids, images = [], []
+            for tile in root.iter('tile'):
+                image = tile.find('image')
+                if image is not None:
+                    tile_ids.append(int(tile.attrib['id']))
+                    images.append(pygame.image.load(join(dirname(self.path), image.attrib['source'])).convert_alpha())
+            for tile_id, surface in zip(tile_ids, atlas.pack(images)):
+                page = next(index for index, atlas_page in enumerate(atlas.pages) if atlas_page is surface.get_parent())
+                tiles[tile_id] = (page, *surface.get_offset(), *surface.size)
+            pages = [data.add_page(page) for page in atlas.pages]
+        return {'pages': pages, 'tiles': tiles}
+
+    def get_tile(self, tile_id: int, flags: tuple[bool, bool, bool] = (False, False, False)) -> pygame.Surface:
+        '''Return a tile, flipped the way Tiled stores it in the gid flags'''
+        if not any(flags):
+            return self.tiles[tile_id]
+        key = (tile_id, flags)
+        if key not in self.transformed:
+            # same transformation as pytmx
+            flip_x, flip_y, flip_diagonal = flags
+            tile = self.tiles[tile_id]
+            if flip_diagonal:
+                tile = pygame.transform.flip(pygame.transform.rotate(tile, 270), True, False)
+            self.transformed[key] = pygame.transform.flip(tile, flip_x, flip_y)
+        return self.transformed[key]
+
+# every map that uses a TSX file shares its tile surfaces, tilesets are only loaded once per run
+tilesets: dict[str, Tileset] = {}
+
+def get_tileset(path: str) -> Tileset:
+    path = normpath(path)
+    if path not in tilesets:
+        tilesets[path] = Tileset(path)
+    return tilesets[path]
+
+class MapObject:
+    '''An object from a Tiled object layer'''
+    def __init__(self, obj) -> None:
+        self.name = obj.name
+        self.x, self.y = obj.x, obj.y
+        self.width, self.height = obj.width, obj.height
+        self.gid = obj.gid
+        self.properties = dict(obj.properties)
+        self.points = [vector(point.x, point.y) for point in obj.points] if hasattr(obj, 'points') else []
+        self.image = None
+
+    def __getstate__(self) -> dict:
+        # the image belongs to a tileset
+        return {**self.__dict__, 'image': None}
+
+class TileLayer:
+    '''A Tiled tile layer as a grid of gids, iterating it yields x, y, gid of the tiles that aren't empty in row order'''
+    def __init__(self, name: str, gids: np.ndarray) -> None:
+        self.name = name
+        self.gids = gids
+
+    def __iter__(self):
+        rows, cols = np.nonzero(self.gids)
+        return zip(cols.tolist(), rows.tolist(), self.gids[rows, cols].tolist())
+
+class CompiledMap:
+    '''A Tiled map compiled into gid grids and object records, its tile images come from the shared tilesets.
+    Loading it maps the file into memory, no XML is parsed. Offers the parts of pytmx's TiledMap the stages use.'''
+    def __init__(self, path: str, cache_path: str = join('.', 'cache', 'maps')) -> None:
+        self.path = path
+        header, self.buffer = load_compiled(path, cache_path, 'level', self.sources, self.compile)
+        self.width, self.height = header['width'], header['height']
+        self.tile_properties = header['tile_properties']
+        self.images = {gid: get_tileset(path).get_tile(tile_id, flags) for gid, (path, tile_id, flags) in header['tiles'].items()}
+
+        self.layers = {}
+        for name, kind, value in header['layers']:
+            if kind == 'tiles':
+                size = self.width * self.height * 4
+                gids = self.buffer[value:value + size].view(np.uint32).reshape(self.height, self.width)
+                self.layers[name] = TileLayer(name, gids)
+            else:
+                for obj in value:
+                    obj.image = self.images.get(obj.gid)
+                self.layers[name] = value
+
+    def tileset_paths(self) -> list[tuple[int, str]]:
+        '''First gid and path of every TSX file the map uses'''
+        tilesets = []
+        for tileset in ElementTree.parse(self.path).getroot().iter('tileset'):
+            if 'source' in tileset.attrib:
+                tilesets.append((int(tileset.attrib['firstgid']), normpath(join(dirname(self.path), tileset.attrib['source']))))
+        return tilesets
+
+    def sources(self) -> list[str]:
+        # changes to a tileset's images are picked up by the tileset itself
+        return [self.path] + [path for _, path in self.tileset_paths()]
+
+    def compile(self, data: CompiledData) -> dict:
+        '''Parse the tmx file with pytmx and keep its gid grids, objects and which tileset tile every gid shows'''
+        tmx_map = load_pygame(self.path)
+
+        # pytmx numbers the tiles a map uses itself, giving flipped tiles their own gid
+        tileset_paths = sorted(self.tileset_paths(), reverse= True)
+        tiles = {}
+        for gid in range(1, len(tmx_map.images)):
+            tiled_gid = tmx_map.tiledgidmap.get(gid)
+            if tiled_gid is None:
+                continue
+            flags = next(flags for map_gid, flags in tmx_map.gidmap[tiled_gid] if map_gid == gid)
+            firstgid, path = next((firstgid, path) for firstgid, path in tileset_paths if firstgid <= tiled_gid)
+            tiles[gid] = (path, tiled_gid - firstgid, (flags.flipped_horizontally, flags.flipped_vertically, flags.flipped_diagonally))
+
+        tile_properties = {}
+        for gid, properties in tmx_map.tile_properties.items():
+            properties = dict(properties)
+            if 'frames' in properties:
+                properties['frames'] = [AnimationFrame(frame.gid, frame.duration) for frame in properties['frames']]
+            tile_properties[gid] = properties
+
+        layers = []
+        for layer in tmx_map.layers:
+            if hasattr(layer, 'data'):
+                layers.append((layer.name, 'tiles', data.add(np.array(layer.data, dtype= np.uint32).tobytes())))
+            else:
+                layers.append((layer.name, 'objects', [MapObject(obj) for obj in layer]))
+
+        return {
+            'width': tmx_map.width,
+            'height': tmx_map.height,
+            'tiles': tiles,
+            'tile_properties': tile_properties,
+            'layers': layers
+        }
+
+    def get_layer_by_name(self, name: str) -> TileLayer | list[MapObject]:
+        try:
+            return self.layers[name]
+        except KeyError:
+            raise ValueError(f'Layer "{name}" not found.')
+
+    def get_tile_image_by_gid(self, gid: int) -> pygame.Surface | None:
+        return self.images.get(gid)
+
+    def get_tile_properties_by_gid(self, gid: int) -> dict | None:
+        return self.tile_properties.get(gid)
@@ -1,27 +1,54 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from gdata import GameData
+
 from settings import *
-from sprites import Heart
+from animation import animation_clocks
+from text import get_glyph_atlas
 
 class UI:
-    def __init__(self, font, frames) -> None:
-        self.display = pygame.display.get_surface()
-        self.sprites = pygame.sprite.Group()
+    '''The HUD, kept on a surface that is only drawn again when health, coins or the heart animation frame change'''
+    def __init__(self, font, frames, data: GameData) -> None:
+        self.screen = data.screen
+        self.data = data
         self.font = font
-        
+
         # health
         self.heart_frames = frames['heart']
+        self.heart_clock = animation_clocks.get(self.heart_frames)
         self.heart_surface_width = self.heart_frames[0].get_width()
         self.heart_padding = 2
-    
+
+        self.surface = pygame.Surface((self.screen.get_width(), self.heart_frames[0].get_height() + 4), pygame.SRCALPHA)
+        self.dirty = True
+        self.heart_index = self.heart_clock.index
+        data.subscribe(self.on_change)
+
+    def on_change(self, name, value) -> None:
+        self.dirty = True
+
     def create_hearts(self, amount) -> None:
-        for sprite in self.sprites:
-            sprite.kill()
-        
+        '''Draw a heart for every point of health'''
         for heart in range(amount):
             x = 2 + heart * (self.heart_surface_width + self.heart_padding)
             y = 2
-            Heart((x, y), self.heart_frames, self.sprites)
-    
-    def update(self, dt) -> None:
-        self.sprites.update(dt)
-        self.sprites.draw(self.display)
+            self.surface.blit(self.heart_clock.image, (x, y))
 
+    def show_coins(self) -> None:
+        '''Display the coin count in the top right corner'''
+        glyphs = get_glyph_atlas(self.font)
+        coins = f'{self.data.coins}'
+        glyphs.draw(self.surface, coins, 'white', (self.surface.get_width() - glyphs.size(coins)[0] - 2, 2))
+
+    def update(self, dt) -> None:
+        '''Draw the HUD onto the screen in one blit, rendering it again first if anything it shows changed'''
+        if self.heart_clock.index != self.heart_index:
+            self.heart_index = self.heart_clock.index
+            self.dirty = True
+        if self.dirty:
+            self.dirty = False
+            self.surface.fill((0, 0, 0, 0))
+            self.create_hearts(self.data.health)
+            self.show_coins()
+        self.screen.blit(self.surface, (0, 0))
@@ -0,0 +1,9 @@
+import os
+import sys
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'code'))
+
+import pygame
+pygame.display.init()
+pygame.display.set_mode((1, 1))
@@ -0,0 +1,29 @@
+import pygame
+from animation import AnimationClocks
+
+class Stage:
+    pass
+
+def test_only_the_running_stage_and_shared_clocks_advance():
+    clocks = AnimationClocks()
+    frames = [pygame.Surface((1, 1)) for _ in range(4)]
+    level, pause = Stage(), Stage()
+    shared = clocks.get(frames)
+    with clocks.using(level):
+        level_clock = clocks.get(frames)
+    with clocks.using(pause):
+        pause_clock = clocks.get(frames)
+    assert len({id(shared), id(level_clock), id(pause_clock)}) == 3
+    
+    clocks.update(0.25, pause)
+    assert pause_clock.frame_index > 0 and shared.frame_index > 0
+    assert level_clock.frame_index == 0
+
+def test_clocks_made_while_a_stage_runs_belong_to_it():
+    clocks = AnimationClocks()
+    frames = [pygame.Surface((1, 1)) for _ in range(4)]
+    level, overworld = Stage(), Stage()
+    clocks.update(0.1, level)
+    clock = clocks.get(frames)
+    clocks.update(0.1, overworld)
+    assert clock.frame_index == 0
@@ -0,0 +1,28 @@
+import pygame
+from support import Atlas
+
+def test_small_frame_after_oversized_frame():
+    atlas = Atlas(page_size= 64)
+    small_before = pygame.Surface((16, 16), pygame.SRCALPHA)
+    oversized = pygame.Surface((80, 20), pygame.SRCALPHA)
+    small_after = pygame.Surface((16, 16), pygame.SRCALPHA)
+    small_before.fill('red')
+    oversized.fill('green')
+    small_after.fill('blue')
+    
+    # placed one at a time, the shelf page is already in use when the oversized frame arrives
+    first, = atlas.pack([small_before])
+    big, = atlas.pack([oversized])
+    second, = atlas.pack([small_after])
+    
+    assert big.get_parent() is not first.get_parent()
+    assert second.get_parent() is first.get_parent()
+    assert second.get_at((0, 0)) == pygame.Color('blue')
+    assert big.get_at((79, 19)) == pygame.Color('green')
+    assert first.get_at((0, 0)) == pygame.Color('red')
+
+def test_oversized_frame_first():
+    atlas = Atlas(page_size= 64)
+    big, small = atlas.pack([pygame.Surface((100, 100), pygame.SRCALPHA), pygame.Surface((8, 8), pygame.SRCALPHA)])
+    assert small.get_parent() is not big.get_parent()
+    assert len(atlas.pages) == 2
@@ -0,0 +1,26 @@
+import pygame
+from camera import TileChunks
+
+def test_hidden_tile_is_baked_out_and_back_in():
+    chunks = TileChunks(chunk_size= 32)
+    tile = pygame.Surface((16, 16), pygame.SRCALPHA)
+    tile.fill('white')
+    chunks.bake((16, 0), tile)
+    chunks.bake((0, 0), tile)
+    
+    chunks.show({(16, 0): False})
+    assert chunks.chunks[(0, 0)].get_at((20, 4)).a == 0
+    assert chunks.chunks[(0, 0)].get_at((4, 4)) == pygame.Color('white')
+    
+    chunks.show({(16, 0): True})
+    assert chunks.chunks[(0, 0)].get_at((20, 4)) == pygame.Color('white')
+
+def test_tile_across_chunks_is_hidden_in_each():
+    chunks = TileChunks(chunk_size= 32)
+    tile = pygame.Surface((48, 16), pygame.SRCALPHA)
+    tile.fill('white')
+    chunks.bake((16, 0), tile)
+    
+    chunks.show({(16, 0): False})
+    assert chunks.chunks[(0, 0)].get_at((20, 4)).a == 0
+    assert chunks.chunks[(1, 0)].get_at((20, 4)).a == 0
@@ -0,0 +1,11 @@
+import pygame
+from colours import change_colours, ColourPalette
+
+def test_subsurface_recolours_only_its_own_pixels():
+    parent = pygame.Surface((40, 10))
+    parent.fill('black')
+    change_colours((parent.subsurface((10, 7, 5, 3)), ), ColourPalette.green, True)
+    for x in range(40):
+        for y in range(10):
+            inside = 10 <= x < 15 and 7 <= y < 10
+            assert parent.get_at((x, y))[:3] == (ColourPalette.green['light'] if inside else (0, 0, 0))
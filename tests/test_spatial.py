@@ -0,0 +1,25 @@
+import pygame
+from spatial import SpatialHash
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, x, y) -> None:
+        super().__init__()
+        self.rect = pygame.FRect(x, y, 16, 16)
+
+def test_query_keeps_the_order_sprites_were_added_in():
+    spatial = SpatialHash(cell_size= 64)
+    first, second, third = Box(70, 0), Box(10, 0), Box(100, 70)
+    for sprite in (first, second, third):
+        spatial.add(sprite)
+    # moving across cells doesn't change the order either
+    second.rect.x = 200
+    spatial.move(second)
+    assert spatial.query(pygame.FRect(0, 0, 256, 128)) == [first, second, third]
+
+def test_removed_sprite_is_not_found():
+    spatial = SpatialHash(cell_size= 64)
+    sprite = Box(0, 0)
+    spatial.add(sprite)
+    spatial.remove(sprite)
+    assert spatial.query(pygame.FRect(0, 0, 64, 64)) == []
+    assert sprite not in spatial
@@ -0,0 +1,18 @@
+import os
+from os.path import join
+from tilemap import CompiledMap
+
+def test_truncated_compiled_map_is_rebuilt(tmp_path):
+    path = join('.', 'data', 'levels', 'test.tmx')
+    terrain = CompiledMap(path, cache_path= str(tmp_path)).get_layer_by_name('terrain').gids.copy()
+    cache_file, = tmp_path.glob('*.level')
+    size = cache_file.stat().st_size
+    
+    # a write cut short keeps its header but loses the end of the data
+    with open(cache_file, 'r+b') as file:
+        file.truncate(size - 100)
+    
+    rebuilt = CompiledMap(path, cache_path= str(tmp_path)).get_layer_by_name('terrain').gids
+    assert cache_file.stat().st_size == size
+    assert (rebuilt == terrain).all()
+    assert not any(name.endswith('.tmp') for name in os.listdir(tmp_path))